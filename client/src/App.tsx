@@ -14,6 +14,44 @@ interface PodcastResponse {
   audio_url: string;
 }
 
+interface JobSubmitResponse {
+  job_id: string;
+  status: string;
+  status_url: string;
+}
+
+interface JobStatusResponse {
+  job_id: string;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  stage: string | null;
+  progress: number;
+  eta_seconds: number | null;
+  result: PodcastResponse | null;
+  error: string | null;
+}
+
+const API_URL = 'http://localhost:8000';
+const POLL_INTERVAL = 1000; // 1 second
+
+const waitForJob = async (
+  statusUrl: string,
+  onProgress: (progress: number) => void
+): Promise<PodcastResponse> => {
+  for (;;) {
+    const { data } = await axios.get<JobStatusResponse>(`${API_URL}${statusUrl}`);
+    if (data.status === 'completed' && data.result) {
+      return data.result;
+    }
+    if (data.status === 'failed') {
+      throw new Error(data.error || 'Error generating podcast');
+    }
+    if (data.status === 'running') {
+      onProgress(data.progress);
+    }
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL));
+  }
+};
+
 function App() {
   const [showPlayer, setShowPlayer] = useState(false);
   const [isPlayerMinimized, setIsPlayerMinimized] = useState(false);
@@ -34,6 +72,7 @@ function App() {
     isGenerating, 
     isComplete, 
     startProgress, 
+    updateProgress,
     completeProgress, 
     resetProgress 
   } = useProgress(progressDuration);
@@ -65,8 +104,8 @@ function App() {
     formData.append('guest_name', guest);
 
     try {
-      const response = await axios.post<PodcastResponse>(
-        'http://localhost:8000/generate-podcast',
+      const response = await axios.post<JobSubmitResponse>(
+        `${API_URL}/jobs`,
         formData,
         {
           headers: {
@@ -74,9 +113,10 @@ function App() {
           },
         }
       );
+      const result = await waitForJob(response.data.status_url, updateProgress);
 
-      if (response.data.audio_url) {
-        setAudioUrl(`http://localhost:8000${response.data.audio_url}`);
+      if (result.audio_url) {
+        setAudioUrl(`${API_URL}${result.audio_url}`);
         setShowPlayer(true);
         completeProgress();
       } else {
@@ -101,6 +141,12 @@ function App() {
         }
         
         setError(errorMessage);
+      } else if (err instanceof Error) {
+        // Job failures carry the server's error detail
+        const errorMessage = err.message.includes('Could not find any English transcript')
+          ? 'This YouTube video does not have English subtitles. Please try another video or content source.'
+          : err.message;
+        setError(errorMessage);
       } else {
         console.error('Unexpected error:', err);
         setError('An unexpected error occurred');
@@ -97,6 +97,7 @@ export default function AudioPlayerPopup({
     <audio
       ref={audioRef}
       src={audioUrl}
+      preload="metadata"
       className="hidden"
     />
   );
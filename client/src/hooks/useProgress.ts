@@ -19,6 +19,15 @@ export const useProgress = (duration: number) => {
     }, 100);
   }, [duration]);
 
+  const updateProgress = useCallback((value: number) => {
+    // Real progress reported by the server replaces the simulated timer
+    if (progressInterval.current) {
+      clearInterval(progressInterval.current);
+      progressInterval.current = undefined;
+    }
+    setProgress(Math.min(value, 99));
+  }, []);
+
   const completeProgress = useCallback(() => {
     if (progressInterval.current) {
       clearInterval(progressInterval.current);
@@ -42,6 +51,7 @@ export const useProgress = (duration: number) => {
     isGenerating,
     isComplete,
     startProgress,
+    updateProgress,
     completeProgress,
     resetProgress
   };
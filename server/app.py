@@ -1,39 +1,120 @@
-from fastapi import FastAPI, UploadFile, HTTPException, Form, File, Body, BackgroundTasks
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
+from dotenv import load_dotenv
+
+# Modules below read their settings at import time, so .env has to be loaded first
+load_dotenv()
+
+from fastapi import FastAPI, UploadFile, HTTPException, Form, File, Body, BackgroundTasks, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Literal, Union, Dict, List, Any
-import google.generativeai as genai
 import json
-import requests
-from bs4 import BeautifulSoup
-from youtube_transcript_api import YouTubeTranscriptApi
-import PyPDF2
 import io
+import logging
 import os
-import shutil
-from datetime import datetime, timedelta
+import hashlib
+import re
+from contextlib import asynccontextmanager
+from email.utils import formatdate
+from datetime import datetime
 import asyncio
-from fastapi.staticfiles import StaticFiles
-from script import create_podcast
-from urllib.parse import urlparse, parse_qs
+from script import create_podcast, tts_cache
+from generate import (
+    stream_podcast_script, get_source_word_budget, get_conversation_length, condense_content, estimate_tokens
+)
 import uuid
 from pathlib import Path
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from utils.cleanup import cleanup_podcast_files, cleanup_old_files
-from dotenv import load_dotenv
-from datetime import datetime, timedelta
-from apscheduler.triggers.date import DateTrigger
+from jobs import Job, JobManager, format_sse, GENERATION_FAILURES
+from llm import llm_gateway
+from utils.extract_cache import ExtractionCache, canonicalize_url
+from utils.result_cache import ResultCache, make_result_key
+from utils.fetch import HttpFetcher
+from utils.parsing import html_to_text, pdf_page_count, pdf_pages_to_text
+from utils.workers import WorkerPool
+from utils.youtube import extract_youtube_id, fetch_transcript
+from utils.expiry import ExpiryIndex, remove_path
+from utils.store import SharedStore
+from utils.encoding import AudioFormat, media_type_for
+from utils.ranges import RangeNotSatisfiable, make_etag, parse_range, iter_file_range
+from utils.metrics import REGISTRY, Gauge, Histogram, timed, tracer
 
-load_dotenv()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+# Per-request trace spans, kept in memory and served from /traces/{trace_id}
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+tracer.enabled = TRACING_ENABLED
+
+# Startup: heavy dependencies are imported on first use, or by the warm-up right after startup
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+STARTUP_SECONDS = Gauge("aximos_startup_seconds", "Time spent importing the app, starting it and warming it up", ["phase"])
+warmup_task = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create directories, register this worker and start background work; undo it on shutdown"""
+    global expiry_sweeper
+    started = time.perf_counter()
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    os.makedirs(PODCAST_DIR, exist_ok=True)
+    await asyncio.to_thread(store.heartbeat)
+    expiry_sweeper = asyncio.create_task(run_expiry_sweeper())
+    # Heavy dependencies load in the background; requests arriving first load what they need themselves
+    warmup = asyncio.create_task(warm_up()) if WARMUP_ON_STARTUP else None
+    STARTUP_SECONDS.set(time.perf_counter() - started, phase="startup")
+    logger.info(f"Imported in {IMPORT_SECONDS:.2f}s, started in {time.perf_counter() - started:.2f}s")
+    try:
+        yield
+    finally:
+        if warmup is not None:
+            warmup.cancel()
+        await job_manager.shutdown()
+        await http_fetcher.aclose()
+        worker_pool.shutdown()
+        expiry_sweeper.cancel()
+        await asyncio.to_thread(store.leave)
 
 app = FastAPI(
     title="Podcast Generator API",
     description="API for generating podcasts from various content sources including PDF files, YouTube videos, web articles, and text content.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+class UploadSizeLimit:
+    """
+    Reject form posts whose Content-Length is over the upload limit before their body is received.
+
+    The multipart parser spools the whole body before handlers run, so the
+    copy-time check in save_uploaded_file alone would accept it all first.
+    Chunked bodies have no length up front and are only checked there.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
+            headers = dict(scope["headers"])
+            length = headers.get(b"content-length", b"")
+            if (
+                headers.get(b"content-type", b"").startswith(b"multipart/form-data")
+                and length.isdigit()
+                and int(length) > (MAX_UPLOAD_MB + UPLOAD_FORM_OVERHEAD_MB) * 1024 * 1024
+            ):
+                response = JSONResponse({"detail": f"File exceeds the {MAX_UPLOAD_MB:g} MB upload limit"}, status_code=413)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+# Added before CORS, so its responses still carry CORS headers
+app.add_middleware(UploadSizeLimit)
+
 # Enable CORS with specific origin
 app.add_middleware(
     CORSMiddleware,
@@ -43,14 +124,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create necessary directories
+# Created at startup
 UPLOAD_DIR = "files"
 PODCAST_DIR = "podcast_output"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(PODCAST_DIR, exist_ok=True)
 
-# Mount static directories
-app.mount("/podcasts", StaticFiles(directory=PODCAST_DIR), name="podcasts")
+# State shared by all worker processes on this host: jobs, artifact expiry and leader leases
+SHARED_STORE_PATH = os.getenv("SHARED_STORE_PATH", "aximos.db")
+HEARTBEAT_INTERVAL = 15.0  # Seconds between worker heartbeats and sweeper runs
+store = SharedStore(SHARED_STORE_PATH, HEARTBEAT_INTERVAL)
+
+# Background generation jobs
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "4"))
+JOB_RETENTION_MINUTES = float(os.getenv("JOB_RETENTION_MINUTES", "10"))
+job_manager = JobManager(MAX_CONCURRENT_JOBS, JOB_RETENTION_MINUTES * 60, store)
+
+EXTRACTION_SECONDS = Histogram("aximos_extraction_seconds", "Time to extract the text of a content source", ["source"])
+GENERATIONS_IN_FLIGHT = Gauge("aximos_generations_in_flight", "Podcast generations currently running in this process")
+JOBS = Gauge("aximos_jobs", "Background jobs held by this process", ["status"])
+JOBS.set_function(lambda: job_manager.queued, status="queued")
+JOBS.set_function(lambda: job_manager.running, status="running")
+STREAM_CHUNK_SIZE = 64 * 1024  # Bytes read per chunk when streaming audio
+FILE_CHUNK_SIZE = 256 * 1024  # Bytes read per chunk when serving finished podcasts
+PODCAST_FILE_NAME = re.compile(r"^[\w-]+\.(mp3|opus|m4a)$")
+# Stream the Gemini response and start synthesizing turns before the whole script is generated
+SCRIPT_STREAMING = os.getenv("SCRIPT_STREAMING", "true").lower() in ("1", "true", "yes")
+
+# Cache of extracted source text, keyed by canonical URL, YouTube video ID or PDF hash
+EXTRACT_CACHE_TTL_MINUTES = float(os.getenv("EXTRACT_CACHE_TTL_MINUTES", "60"))
+EXTRACT_CACHE_MAX_MB = float(os.getenv("EXTRACT_CACHE_MAX_MB", "64"))
+extraction_cache = ExtractionCache(EXTRACT_CACHE_TTL_MINUTES * 60, int(EXTRACT_CACHE_MAX_MB * 1024 * 1024))
+extraction_inflight = {}  # source key -> task extracting that source
+
+# Batch generation
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+BATCH_MAX_CONCURRENT = int(os.getenv("BATCH_MAX_CONCURRENT", "2"))  # Jobs of one batch running at once
+
+# Generated podcasts are deleted this long after they are created, uploads this long after they are saved
+PODCAST_TTL_MINUTES = float(os.getenv("PODCAST_TTL_MINUTES", "10"))
+UPLOAD_TTL_MINUTES = float(os.getenv("UPLOAD_TTL_MINUTES", "60"))
+
+# One expiry index decides when uploads and podcasts are deleted, by deadline and by total disk usage
+EXPIRY_MAX_DISK_MB = float(os.getenv("EXPIRY_MAX_DISK_MB", "2048"))
+expiry_index = ExpiryIndex(store, int(EXPIRY_MAX_DISK_MB * 1024 * 1024))
+expiry_sweeper = None
+
+# Reuse results for identical content, voices and length while the podcast file is still around
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+RESULT_CACHE_GRACE_SECONDS = float(os.getenv("RESULT_CACHE_GRACE_SECONDS", "120"))  # Min lifetime left on a reused audio URL
+result_cache = ResultCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_GRACE_SECONDS) if RESULT_CACHE_ENABLED else None
+generating_jobs: Dict[str, Job] = {}  # Result key -> job generating it, for coalesced jobs to follow
+
+# Pooled async HTTP client for web article ingestion
+http_fetcher = HttpFetcher(
+    connect_timeout=float(os.getenv("FETCH_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.getenv("FETCH_READ_TIMEOUT", "10")),
+    total_timeout=float(os.getenv("FETCH_TOTAL_TIMEOUT", "20")),
+    max_bytes=int(float(os.getenv("FETCH_MAX_MB", "5")) * 1024 * 1024),
+    max_redirects=int(os.getenv("FETCH_MAX_REDIRECTS", "5")),
+    max_connections=int(os.getenv("FETCH_MAX_CONNECTIONS", "20")),
+)
+
+# Process pool for CPU-bound parsing, so concurrent generations use more than one core
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(min(4, os.cpu_count() or 1))))
+WORKER_QUEUE_DEPTH = int(os.getenv("WORKER_QUEUE_DEPTH", "16"))
+worker_pool = WorkerPool(WORKER_PROCESSES, WORKER_QUEUE_DEPTH)
+
+# Uploads and PDF extraction
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "50"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes copied per read when saving uploads
+UPLOAD_FORM_OVERHEAD_MB = 1.0  # Allowance for the other form fields when checking a request's size
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "10"))  # Pages extracted per worker call
 
 class PodcastInput(BaseModel):
     host_name: str
@@ -59,62 +203,70 @@ class PodcastInput(BaseModel):
     text_content: Optional[str] = None
     web_url: Optional[str] = None
     length: Literal["Adaptive", "Short", "Medium", "Long"] = "Adaptive"
+    audio_format: Literal["mp3", "opus", "aac"] = "mp3"
+    audio_bitrate: Optional[int] = None  # kbps
+    audio_sample_rate: Optional[int] = None
+    audio_channels: Optional[int] = None
+
+def run_leader_housekeeping(first_run: bool):
+    """Periodic work done by one worker at a time: expire orphans, old jobs and dead workers' pins"""
+    if first_run:
+        # Anything on disk the store does not know about (e.g. from before it existed) gets a fresh lifetime
+        expiry_index.adopt(UPLOAD_DIR, UPLOAD_TTL_MINUTES * 60)
+        expiry_index.adopt(PODCAST_DIR, PODCAST_TTL_MINUTES * 60)
+    store.reap_workers()
+    store.fail_orphaned_jobs()
+    store.prune_jobs(time.time() - JOB_RETENTION_MINUTES * 60)
 
-async def cleanup_old_files():
-    """Clean up files older than 1 hour"""
+async def run_expiry_sweeper():
+    """
+    Send this worker's heartbeat and, on the elected leader only, delete
+    uploads and podcasts as their deadlines pass or the disk quota is exceeded.
+    """
+    was_leader = False
     while True:
+        is_leader = False
         try:
-            current_time = datetime.now()
-            
-            # Clean up files directory
-            for file in os.listdir(UPLOAD_DIR):
-                file_path = os.path.join(UPLOAD_DIR, file)
-                try:
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                except Exception as e:
-                    print(f"Error removing file {file_path}: {e}")
-            
-            # Clean up podcast directory
-            for item in os.listdir(PODCAST_DIR):
-                item_path = os.path.join(PODCAST_DIR, item)
-                try:
-                    # Get item creation time
-                    item_time = datetime.fromtimestamp(os.path.getctime(item_path))
-                    # Remove if older than 1 hour
-                    if current_time - item_time > timedelta(hours=1):
-                        if os.path.isdir(item_path):
-                            shutil.rmtree(item_path)
-                            print(f"Removed old podcast directory: {item}")
-                        else:
-                            os.remove(item_path)
-                            print(f"Removed old podcast file: {item}")
-                except Exception as e:
-                    if "Is a directory" not in str(e):  # Suppress directory-related errors
-                        print(f"Error processing {item_path}: {e}")
-            
+            # The store can be busy with other workers' writes; keep its calls off the event loop
+            await asyncio.to_thread(store.heartbeat)
+            is_leader = await asyncio.to_thread(store.acquire_lease, "sweeper", HEARTBEAT_INTERVAL * 3)
+            if is_leader:
+                await asyncio.to_thread(run_leader_housekeeping, not was_leader)
+                for path in await asyncio.to_thread(expiry_index.collect):
+                    if result_cache is not None:
+                        result_cache.invalidate_folder(path)
+                    await asyncio.to_thread(remove_path, path)
         except Exception as e:
-            print(f"Error during cleanup: {e}")
-        
-        # Check every minute
-        await asyncio.sleep(60)
-
-@app.on_event("startup")
-async def startup_event():
-    """Start the cleanup task when the application starts"""
-    asyncio.create_task(cleanup_old_files())
-
-# Set up the cleanup scheduler
-scheduler = BackgroundScheduler()
-scheduler.add_job(
-    func=lambda: cleanup_old_files(),  
-    trigger=IntervalTrigger(minutes=15),  
-    id='cleanup_job',
-    name='Clean up old podcast files',
-    replace_existing=True,
-    max_instances=1  
-)
-scheduler.start()
+            logger.exception(f"Error during cleanup: {e}")
+        was_leader = is_leader
+        await expiry_index.wait(HEARTBEAT_INTERVAL, until_deadline=is_leader)
+
+def import_dependencies():
+    """Import the SDKs and parsers that requests otherwise load on first use"""
+    import edge_tts
+    import google.generativeai
+    import httpx
+    import bs4
+    import PyPDF2
+    import youtube_transcript_api
+    from llm import retryable_errors
+    retryable_errors()
+
+async def warm_up() -> float:
+    """Load heavy dependencies and the Gemini client, once; returns the seconds it took"""
+    global warmup_task
+    if warmup_task is None:
+        async def run():
+            started = time.perf_counter()
+            await asyncio.to_thread(import_dependencies)
+            if os.getenv("GEMINI_API_KEY"):
+                await asyncio.to_thread(lambda: llm_gateway.model)
+            duration = time.perf_counter() - started
+            STARTUP_SECONDS.set(duration, phase="warmup")
+            logger.info(f"Warmed up in {duration:.2f}s")
+            return duration
+        warmup_task = asyncio.ensure_future(run())
+    return await asyncio.shield(warmup_task)
 
 async def save_uploaded_file(file: UploadFile) -> str:
     """Save an uploaded file and return its path"""
@@ -123,16 +275,31 @@ async def save_uploaded_file(file: UploadFile) -> str:
     
     # Generate a unique filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_{file.filename}"
+    # The random part keeps workers from overwriting each other's same-second uploads
+    filename = f"{timestamp}_{uuid.uuid4().hex[:8]}_{file.filename}"
     file_path = os.path.join(UPLOAD_DIR, filename)
     
     try:
-        # Save the file
-        contents = await file.read()
+        # Copy the upload in chunks so it is never held in memory as a whole
+        size = 0
         with open(file_path, 'wb') as f:
-            f.write(contents)
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_MB * 1024 * 1024:
+                    raise HTTPException(status_code=413, detail=f"File exceeds the {MAX_UPLOAD_MB:g} MB upload limit")
+                f.write(chunk)
+        # Pinned until the generation that uses it has extracted its text
+        await asyncio.to_thread(expiry_index.track, file_path, UPLOAD_TTL_MINUTES * 60, pinned=True)
         return file_path
+    except HTTPException:
+        os.remove(file_path)
+        raise
     except Exception as e:
+        if os.path.exists(file_path):
+            os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
 
 async def validate_content_sources(
@@ -154,130 +321,181 @@ async def validate_content_sources(
             detail="Exactly one content source must be provided (youtube_url, text_content, web_url, or file)"
         )
 
-async def get_content(
+async def resolve_source(
     youtube_url: Optional[str],
     text_content: Optional[str],
     web_url: Optional[str],
     file: Optional[UploadFile]
-):
-    content_type = None
-    content = None
-    
+) -> Dict[str, str]:
+    """Pick the content source to use; uploaded files are saved so they outlive the request"""
     if text_content and text_content != "string" and text_content.strip():
-        content_type = "article"
-        content = text_content
+        return {"content_type": "article", "text_content": text_content}
     elif web_url and web_url != "string" and web_url.strip():
-        content_type = "web article"
-        content = extract_text_from_web(web_url)
+        return {"content_type": "web article", "web_url": web_url}
     elif youtube_url and youtube_url != "string" and youtube_url.strip():
-        content_type = "YouTube video"
-        content = get_youtube_transcript(youtube_url)
+        return {"content_type": "YouTube video", "youtube_url": youtube_url}
     elif file:
         if not file.filename.endswith('.pdf'):
             raise HTTPException(status_code=400, detail="File must be a PDF document")
-        content_type = "PDF document"
         file_path = await save_uploaded_file(file)
-        content = extract_text_from_pdf(file_path)
+        return {"content_type": "PDF document", "file_path": file_path}
     else:
         raise HTTPException(status_code=400, detail="No valid content source provided")
-    
+
+def resolve_audio_format(codec: str, bitrate: Optional[int], sample_rate: Optional[int], channels: Optional[int]) -> AudioFormat:
+    """Validate the requested output format; MP3 without options is edge-tts' own 48 kbps mono, written as is"""
+    try:
+        return AudioFormat.resolve(codec, bitrate, sample_rate, channels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def source_key(source: Dict[str, str]) -> Optional[str]:
+    """Identify a source independently of how it was spelled; None for uploads, which are never shared"""
+    if "text_content" in source:
+        return f"text:{hashlib.sha256(source['text_content'].encode('utf-8')).hexdigest()}"
+    if "web_url" in source:
+        return f"web:{canonicalize_url(source['web_url'])}"
+    if "youtube_url" in source:
+        try:
+            return f"youtube:{extract_youtube_id(source['youtube_url'])}"
+        except ValueError:
+            return None
+    return None
+
+async def get_content(source: Dict[str, str], length: str = "Adaptive"):
+    """Extract the text of a resolved content source"""
+    content_type = source["content_type"]
+    kind = "text" if "text_content" in source else "web" if "web_url" in source else "youtube" if "youtube_url" in source else "pdf"
+    with timed(EXTRACTION_SECONDS, "extraction", source=kind):
+        content = await extract_content(source, length)
     return content, content_type
 
-def extract_text_from_web(url: str) -> str:
+async def extract_content(source: Dict[str, str], length: str) -> str:
+    if "text_content" in source:
+        content = source["text_content"]
+    elif "web_url" in source or "youtube_url" in source:
+        # Requests for the same page or video at the same time share one extraction
+        key = source_key(source)
+        task = extraction_inflight.get(key) if key else None
+        if task is None:
+            extract = extract_text_from_web(source["web_url"]) if "web_url" in source else get_youtube_transcript(source["youtube_url"])
+            task = asyncio.ensure_future(extract)
+            if key:
+                extraction_inflight[key] = task
+                task.add_done_callback(lambda _: extraction_inflight.pop(key, None))
+        content = await asyncio.shield(task)
+    else:
+        content = await extract_text_from_pdf(source["file_path"], max_words=get_source_word_budget(length))
+    
+    return content
+
+async def extract_text_from_web(url: str) -> str:
+    cache_key = f"web:{canonicalize_url(url)}"
+    cached = extraction_cache.get(cache_key)
+    if cached is not None and cached.fresh:
+        return cached.text
+    
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        return soup.get_text()
+        # Revalidate an expired entry instead of downloading the page again
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        
+        response = await http_fetcher.fetch_text(url, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            return extraction_cache.revalidated(cache_key) or cached.text
+        text = await worker_pool.run(html_to_text, response.text)
+        
+        extraction_cache.put(
+            cache_key,
+            text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
+        )
+        return text
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error extracting text from web URL: {str(e)}")
 
-def extract_youtube_id(url: str) -> str:
-    parsed_url = urlparse(url)
-    if parsed_url.hostname == 'youtu.be':
-        return parsed_url.path[1:]
-    if parsed_url.hostname in ('www.youtube.com', 'youtube.com'):
-        if parsed_url.path == '/watch':
-            return parse_qs(parsed_url.query)['v'][0]
-    raise ValueError("Invalid YouTube URL")
-
-def get_youtube_transcript(url: str) -> str:
+async def get_youtube_transcript(url: str) -> str:
     """Get transcript from YouTube video"""
     try:
-        # Extract video ID from URL
-        if "v=" in url:
-            video_id = url.split("v=")[1].split("&")[0]
-        else:
-            video_id = url.split("/")[-1]
-
-        # Try different English language codes
-        english_codes = ['en', 'en-US', 'en-GB', 'en-IN', 'en-AU', 'en-CA']
-        transcript = None
-        error_message = ""
-
-        for lang_code in english_codes:
-            try:
-                transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=[lang_code])
-                break
-            except Exception as e:
-                error_message = str(e)
-                continue
-
-        if not transcript:
-            # If no English transcript found, try auto-generated ones
-            try:
-                transcript = YouTubeTranscriptApi.get_transcript(video_id)
-            except Exception as e:
-                error_message = str(e)
-
-        if not transcript:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Could not find any English transcript for the video. Error: {error_message}"
-            )
-
-        # Combine all transcript text
-        full_text = " ".join(item["text"] for item in transcript)
-        return full_text
-
+        video_id = extract_youtube_id(url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    cache_key = f"youtube:{video_id}"
+    cached = extraction_cache.get(cache_key)
+    if cached is not None and cached.fresh:
+        return cached.text
+    
+    try:
+        # The transcript API is blocking; keep it off the event loop
+        full_text = await asyncio.to_thread(fetch_transcript, video_id)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error getting YouTube transcript: {str(e)}")
+    
+    extraction_cache.put(cache_key, full_text)
+    return full_text
 
-def extract_text_from_pdf(file_path: str) -> str:
+def hash_file(file_path: str) -> str:
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def extract_pdf_pages(file_path: str, max_words: Optional[int] = None) -> str:
+    """
+    Extract a PDF's text, spreading page ranges across the worker pool.
+
+    Ranges are extracted one wave (one range per worker) at a time, and
+    extraction stops early once max_words words have been collected.
+    """
+    page_count = await worker_pool.run(pdf_page_count, file_path)
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    
+    text = []
+    word_count = 0
+    for wave_start in range(0, len(ranges), worker_pool.max_workers):
+        wave = ranges[wave_start:wave_start + worker_pool.max_workers]
+        results = await asyncio.gather(*(worker_pool.run(pdf_pages_to_text, file_path, start, end) for start, end in wave))
+        for chunk in results:
+            text.append(chunk)
+            word_count += len(chunk.split())
+        if max_words and word_count >= max_words:
+            logger.info(f"Stopped PDF extraction after {wave[-1][1]} of {page_count} pages ({word_count} words)")
+            break
+    
+    return '\n'.join(text)
+
+async def extract_text_from_pdf(file_path: str, max_words: Optional[int] = None) -> str:
     try:
-        with open(file_path, 'rb') as file:
-            # Create a PDF reader object
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            # Extract text from all pages
-            text = []
-            for page in pdf_reader.pages:
-                text.append(page.extract_text())
-            
-            # Join all text with newlines
-            full_text = '\n'.join(text)
-            
-            if not full_text.strip():
-                raise ValueError("No text content found in PDF")
-                
-            return full_text
+        cache_key = f"pdf:{await asyncio.to_thread(hash_file, file_path)}:{max_words or 'all'}"
+        cached = extraction_cache.get(cache_key)
+        if cached is not None and cached.fresh:
+            return cached.text
+        
+        full_text = await extract_pdf_pages(file_path, max_words)
+        
+        if not full_text.strip():
+            raise ValueError("No text content found in PDF")
+        
+        extraction_cache.put(cache_key, full_text)
+        return full_text
             
     except FileNotFoundError:
         raise HTTPException(status_code=400, detail=f"PDF file not found: {file_path}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error extracting text from PDF: {str(e)}")
 
-async def generate_podcast_script(article_text: str, host_name: str, guest_name: str, length: str, model, content_type):
+async def generate_podcast_script(article_text: str, host_name: str, guest_name: str, length: str, model, content_type, turn_range: tuple = None):
     """Generate a podcast script using the Gemini model"""
     from generate import generate_podcast_script as gps
-    return await gps(article_text, host_name, guest_name, length, model, content_type)
-
-def setup_model(api_key: str):
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel('gemini-pro')
+    return await gps(article_text, host_name, guest_name, length, model, content_type, turn_range)
 
 class PodcastResponse(BaseModel):
     script: List[Dict[str, Dict[str, str]]]
@@ -294,13 +512,165 @@ class PodcastResponse(BaseModel):
             }
         }
 
-def create_podcast_folder():
-    """Create a unique folder for this podcast generation"""
+async def create_podcast_folder():
+    """Create a unique folder for this podcast generation, pinned until the generation ends"""
     folder_name = str(uuid.uuid4())
     folder_path = os.path.join(PODCAST_DIR, folder_name)
     os.makedirs(folder_path, exist_ok=True)
+    await asyncio.to_thread(expiry_index.track, folder_path, PODCAST_TTL_MINUTES * 60, pinned=True)
     return folder_path
 
+async def stream_script_into_podcast(job: Job, content: str, content_type: str, host_name: str, guest_name: str, length: str, turn_range: tuple, model, generation_folder: str, audio_format: AudioFormat):
+    """Stream the script from Gemini and synthesize each turn as soon as it has been parsed"""
+    script = []
+    script_error = None
+    
+    async def dialogues():
+        nonlocal script_error
+        try:
+            async for dialogue in stream_podcast_script(content, host_name, guest_name, length, model, content_type, turn_range):
+                if not script:
+                    # Synthesis overlaps with the rest of script generation from here on
+                    job.start_stage("synthesize", exclusive=False)
+                script.append(dialogue)
+                yield dialogue
+        except Exception as e:
+            script_error = e
+            raise
+        duration = job.finish_stage("script", {"turns": len(script)})
+        job.emit("script_generated", turns=len(script), duration=duration)
+    
+    podcast_file = await create_podcast(
+        dialogues(), host_name, guest_name, generation_folder,
+        on_turn=job.turn_done,
+        on_output=job.set_audio_path,
+        audio_format=audio_format
+    )
+    
+    if script_error is not None or not script:
+        raise HTTPException(status_code=500, detail=f"Failed to generate podcast script: {script_error or 'no dialogue returned'}")
+    return script, podcast_file
+
+async def produce_podcast(job: Job, content: str, content_type: str, host_name: str, guest_name: str, length: str, audio_format: AudioFormat):
+    """Script, synthesize and publish a podcast; returns (result, podcast_file, cleanup timestamp)"""
+    # Create a unique folder for this generation
+    generation_folder = await create_podcast_folder()
+    try:
+        return await generate_into_folder(job, content, content_type, host_name, guest_name, length, audio_format, generation_folder)
+    except BaseException:
+        # Nothing useful is left in the folder of a failed generation
+        await asyncio.to_thread(expiry_index.extend, generation_folder, 0)
+        raise
+    finally:
+        await asyncio.to_thread(expiry_index.unpin, generation_folder)
+
+async def generate_into_folder(job: Job, content: str, content_type: str, host_name: str, guest_name: str, length: str, audio_format: AudioFormat, generation_folder: str):
+    """Condense, script and synthesize into generation_folder; see produce_podcast"""
+    # Shared Gemini gateway; rate limits and retries apply across all requests
+    model = llm_gateway
+    
+    # The number of turns follows the size of the original input, even if it gets condensed
+    turn_range = get_conversation_length(content, length)
+    
+    # Condense long inputs so the script prompt stays within its token budget
+    job.start_stage("condense")
+    input_tokens = estimate_tokens(content)
+    content = await condense_content(content, model, content_type)
+    duration = job.finish_stage("condense", {"input_tokens": input_tokens, "output_tokens": estimate_tokens(content)})
+    if estimate_tokens(content) < input_tokens:
+        job.emit("content_condensed", input_tokens=input_tokens, output_tokens=estimate_tokens(content), duration=duration)
+    
+    # Generate the podcast script using Gemini
+    job.start_stage("script", {"turn_range": turn_range})
+    if SCRIPT_STREAMING:
+        script, podcast_file = await stream_script_into_podcast(
+            job, content, content_type, host_name, guest_name, length, turn_range, model, generation_folder, audio_format
+        )
+    else:
+        script = await generate_podcast_script(content, host_name, guest_name, length, model, content_type, turn_range)
+        
+        if not script:
+            raise HTTPException(status_code=500, detail="Failed to generate podcast script")
+        duration = job.finish_stage("script", {"turns": len(script)})
+        job.emit("script_generated", turns=len(script), duration=duration)
+        
+        # Create the podcast with different voices
+        job.start_stage("synthesize")
+        podcast_file = await create_podcast(
+            script, host_name, guest_name, generation_folder,
+            on_turn=job.turn_done,
+            on_output=job.set_audio_path,
+            audio_format=audio_format
+        )
+    
+    if not podcast_file:
+        raise HTTPException(status_code=500, detail="Failed to create podcast audio")
+    
+    synthesis_duration = job.finish_stage("synthesize")
+    job.start_stage("finalize")
+    # Return relative path from PODCAST_DIR
+    relative_path = os.path.relpath(podcast_file, PODCAST_DIR)
+    audio_url = f"/podcasts/{relative_path}"
+    
+    # The podcast's lifetime starts now that it is complete
+    deleted_at = await asyncio.to_thread(expiry_index.extend, generation_folder, PODCAST_TTL_MINUTES * 60)
+    
+    job.emit(
+        "export_finished",
+        audio_url=audio_url,
+        size=os.path.getsize(podcast_file),
+        duration=synthesis_duration,
+    )
+    # Finished here rather than by the job manager, so /generate-podcast times it too
+    job.finish_stage("finalize")
+    return {"script": script, "audio_url": audio_url}, podcast_file, deleted_at
+
+async def run_generation(job: Job, source: Dict[str, str], host_name: str, guest_name: str, length: str = "Adaptive", audio_format: AudioFormat = AudioFormat()) -> Dict[str, Any]:
+    """Run the full pipeline for one podcast, reporting stage progress on job"""
+    # The job ID doubles as the trace ID; spans from every task started below land in this trace
+    tracer.start(job.id)
+    with GENERATIONS_IN_FLIGHT.track_in_progress():
+        return await run_pipeline(job, source, host_name, guest_name, length, audio_format)
+
+async def run_pipeline(job: Job, source: Dict[str, str], host_name: str, guest_name: str, length: str, audio_format: AudioFormat) -> Dict[str, Any]:
+    # Get the content and its type
+    job.start_stage("extract")
+    try:
+        content, content_type = await get_content(source, length)
+    finally:
+        if "file_path" in source:
+            await asyncio.to_thread(expiry_index.unpin, source["file_path"])
+    word_count = len(content.split())
+    duration = job.finish_stage("extract", {"word_count": word_count})
+    job.emit("content_extracted", content_type=content_type, word_count=word_count, duration=duration)
+    
+    if result_cache is None:
+        result, _, _ = await produce_podcast(job, content, content_type, host_name, guest_name, length, audio_format)
+        return result
+    
+    # Identical requests reuse a finished podcast or join the one already being generated
+    result_key = make_result_key(content, host_name, guest_name, length, audio_format.key)
+    leader = generating_jobs.get(result_key)
+    if leader is not None:
+        # Joining jobs stream the leader's audio as it is written
+        leader.add_follower(job)
+    
+    async def produce():
+        generating_jobs[result_key] = job
+        try:
+            return await produce_podcast(job, content, content_type, host_name, guest_name, length, audio_format)
+        finally:
+            generating_jobs.pop(result_key, None)
+    
+    result, reused = await result_cache.get_or_create(result_key, produce)
+    if reused:
+        for stage in ("condense", "script", "synthesize", "finalize"):
+            job.finish_stage(stage, {"reused": True})
+        # Extract is already finished; nothing is left running for the job manager to close
+        job.current_stage = None
+        job.emit("result_reused", audio_url=result["audio_url"])
+    return result
+
 @app.post(
     "/generate-podcast",
     summary="Generate a podcast",
@@ -309,61 +679,413 @@ def create_podcast_folder():
 )
 async def generate_podcast(
     background_tasks: BackgroundTasks,
+    response: Response,
     file: Optional[UploadFile] = File(None),
     host_name: str = Form(...),  # Required field, no default
     guest_name: str = Form(...),  # Required field, no default
     youtube_url: Optional[str] = Form(None),
     text_content: Optional[str] = Form(None),
-    web_url: Optional[str] = Form(None)
+    web_url: Optional[str] = Form(None),
+    length: Literal["Adaptive", "Short", "Medium", "Long"] = Form("Adaptive"),
+    audio_format: Literal["mp3", "opus", "aac"] = Form("mp3"),
+    audio_bitrate: Optional[int] = Form(None),  # kbps
+    audio_sample_rate: Optional[int] = Form(None),
+    audio_channels: Optional[int] = Form(None)
 ):
+    output = resolve_audio_format(audio_format, audio_bitrate, audio_sample_rate, audio_channels)
+    job = Job()
+    if TRACING_ENABLED:
+        response.headers["X-Trace-Id"] = job.id
     try:
-        # Create a unique folder for this generation
-        generation_folder = create_podcast_folder()
-        
         # Validate content sources
         await validate_content_sources(youtube_url, text_content, web_url, file)
+        source = await resolve_source(youtube_url, text_content, web_url, file)
         
-        api_key = os.getenv("GEMINI_API_KEY")  # Gemini API key
-        model = setup_model(api_key)
-        
-        # Get the content and its type
-        content, content_type = await get_content(youtube_url, text_content, web_url, file)
+        result = await run_generation(job, source, host_name, guest_name, length, output)
+        return PodcastResponse(**result)
         
-        # Generate the podcast script using Gemini with fixed length
-        script = await generate_podcast_script(content, host_name, guest_name, "Adaptive", model, content_type)
-        
-        if not script:
-            raise HTTPException(status_code=500, detail="Failed to generate podcast script")
-        
-        # Create the podcast with different voices
-        podcast_file = await create_podcast(script, host_name, guest_name, generation_folder)
-        
-        if not podcast_file:
-            raise HTTPException(status_code=500, detail="Failed to create podcast audio")
-        
-        # Return relative path from PODCAST_DIR
-        relative_path = os.path.relpath(podcast_file, PODCAST_DIR)
+    except HTTPException as e:
+        # Keep deliberate status codes, like 413 for an oversized upload
+        if job.current_stage:
+            GENERATION_FAILURES.inc(stage=job.current_stage)
+        logger.warning(f"Podcast generation failed: {e.detail}")
+        raise
+    except Exception as e:
+        if job.current_stage:
+            GENERATION_FAILURES.inc(stage=job.current_stage)
+        logger.error(f"Podcast generation failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "completed", "failed"]
+    stage: Optional[str] = None
+    stages: Dict[str, Dict[str, Any]]
+    progress: float
+    eta_seconds: Optional[float] = None
+    turns_done: int
+    turns_total: int
+    audio_stream_url: Optional[str] = None
+    result: Optional[PodcastResponse] = None
+    error: Optional[str] = None
+
+@app.post(
+    "/jobs",
+    summary="Submit a podcast generation job",
+    response_model=JobSubmitResponse,
+    status_code=202,
+    response_description="Returns the job ID to poll for status and result"
+)
+async def submit_podcast_job(
+    file: Optional[UploadFile] = File(None),
+    host_name: str = Form(...),
+    guest_name: str = Form(...),
+    youtube_url: Optional[str] = Form(None),
+    text_content: Optional[str] = Form(None),
+    web_url: Optional[str] = Form(None),
+    length: Literal["Adaptive", "Short", "Medium", "Long"] = Form("Adaptive"),
+    audio_format: Literal["mp3", "opus", "aac"] = Form("mp3"),
+    audio_bitrate: Optional[int] = Form(None),  # kbps
+    audio_sample_rate: Optional[int] = Form(None),
+    audio_channels: Optional[int] = Form(None)
+):
+    output = resolve_audio_format(audio_format, audio_bitrate, audio_sample_rate, audio_channels)
+    await validate_content_sources(youtube_url, text_content, web_url, file)
+    source = await resolve_source(youtube_url, text_content, web_url, file)
+    
+    job = await job_manager.submit(lambda job: run_generation(job, source, host_name, guest_name, length, output))
+    return JobSubmitResponse(job_id=job.id, status=job.status, status_url=f"/jobs/{job.id}")
+
+class BatchInput(BaseModel):
+    items: List[PodcastInput]
+
+class BatchItem(BaseModel):
+    index: int
+    job_id: str
+    duplicate_of: Optional[int] = None
+
+class BatchSubmitResponse(BaseModel):
+    batch_id: str
+    status_url: str
+    results_url: str
+    items: List[BatchItem]
+
+class BatchItemStatus(BatchItem):
+    status: str
+    progress: float
+    result: Optional[PodcastResponse] = None
+    error: Optional[str] = None
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    total: int
+    completed: int
+    failed: int
+    items: List[BatchItemStatus]
+
+@app.post(
+    "/batches",
+    summary="Submit many podcast generations at once",
+    response_model=BatchSubmitResponse,
+    status_code=202,
+    response_description="Returns one job per distinct item, plus URLs for batch status and incremental results"
+)
+async def submit_podcast_batch(batch: BatchInput):
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="A batch needs at least one item")
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch can have at most {BATCH_MAX_ITEMS} items")
+    
+    sources = []
+    outputs = []
+    for index, item in enumerate(batch.items):
+        try:
+            outputs.append(resolve_audio_format(item.audio_format, item.audio_bitrate, item.audio_sample_rate, item.audio_channels))
+            await validate_content_sources(item.youtube_url, item.text_content, item.web_url, None)
+            sources.append(await resolve_source(item.youtube_url, item.text_content, item.web_url, None))
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"Item {index}: {e.detail}")
+    
+    # Items of a batch share one concurrency cap on top of the global job, LLM and TTS limits
+    gate = asyncio.Semaphore(BATCH_MAX_CONCURRENT)
+    first_index = {}
+    items = []
+    for index, (item, source, output) in enumerate(zip(batch.items, sources, outputs)):
+        # Identical items become a single job
+        key = (source_key(source), item.host_name, item.guest_name, item.length, output.key)
+        if key[0] is not None and key in first_index:
+            original = items[first_index[key]]
+            items.append({"index": index, "job_id": original["job_id"], "duplicate_of": original["index"]})
+            continue
         
-        # Schedule cleanup after 30 minutes using APScheduler
-        cleanup_time = datetime.now() + timedelta(minutes=10)
-        scheduler.add_job(
-            func=cleanup_podcast_files,
-            trigger=DateTrigger(run_date=cleanup_time),
-            args=[os.path.dirname(relative_path), PODCAST_DIR],
-            id=f'cleanup_{os.path.dirname(relative_path)}',
-            name=f'Cleanup podcast {relative_path}',
-            replace_existing=True
+        job = await job_manager.submit(
+            lambda job, source=source, item=item, output=output: run_generation(
+                job, source, item.host_name, item.guest_name, item.length, output
+            ),
+            gate=gate
         )
+        first_index[key] = index
+        items.append({"index": index, "job_id": job.id, "duplicate_of": None})
+    
+    batch_id = uuid.uuid4().hex
+    await asyncio.to_thread(store.save_batch, batch_id, items)
+    return BatchSubmitResponse(
+        batch_id=batch_id,
+        status_url=f"/batches/{batch_id}",
+        results_url=f"/batches/{batch_id}/results",
+        items=items
+    )
 
-        return PodcastResponse(
-            script=script,
-            audio_url=f"/podcasts/{relative_path}"
-        )
-        
-    except Exception as e:
-        print(f"Error: {str(e)}")  # Debug log
-        raise HTTPException(status_code=500, detail=str(e))
+async def batch_item_status(item: Dict[str, Any]) -> Dict[str, Any]:
+    job = await job_manager.get(item["job_id"])
+    if job is None:
+        return {**item, "status": "failed", "progress": 0.0, "error": "Job has expired"}
+    state = job.to_dict()
+    return {**item, "status": state["status"], "progress": state["progress"], "result": state["result"], "error": state["error"]}
+
+@app.get(
+    "/batches/{batch_id}",
+    summary="Get the status of every item in a batch",
+    response_model=BatchStatusResponse
+)
+async def get_podcast_batch(batch_id: str):
+    items = await asyncio.to_thread(store.load_batch, batch_id)
+    if items is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    statuses = [await batch_item_status(item) for item in items]
+    return BatchStatusResponse(
+        batch_id=batch_id,
+        total=len(statuses),
+        completed=sum(1 for status in statuses if status["status"] == "completed"),
+        failed=sum(1 for status in statuses if status["status"] == "failed"),
+        items=statuses
+    )
+
+async def wait_until_finished(job_id: str):
+    job = await job_manager.get(job_id)
+    while job is not None and not job.finished:
+        await job.wait_for_event(timeout=5.0)
+
+@app.get(
+    "/batches/{batch_id}/results",
+    summary="Stream a batch's results as its items finish",
+    response_description="Newline-delimited JSON, one line per item in completion order, ending when every item is done"
+)
+async def stream_podcast_batch_results(batch_id: str):
+    items = await asyncio.to_thread(store.load_batch, batch_id)
+    if items is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    async def results():
+        # Duplicates finish together with the item they point at
+        by_job = {}
+        for item in items:
+            by_job.setdefault(item["job_id"], []).append(item)
+        waiters = {asyncio.ensure_future(wait_until_finished(job_id)): job_id for job_id in by_job}
+        try:
+            while waiters:
+                done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in done:
+                    for item in by_job[waiters.pop(waiter)]:
+                        yield json.dumps(await batch_item_status(item)) + "\n"
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+    
+    return StreamingResponse(
+        results(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get(
+    "/jobs/{job_id}",
+    summary="Get the status of a podcast generation job",
+    response_model=JobStatusResponse,
+    response_description="Returns per-stage state, progress, ETA and, once completed, the result"
+)
+async def get_podcast_job(job_id: str):
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get(
+    "/jobs/{job_id}/events",
+    summary="Stream progress events for a podcast generation job",
+    response_description="Server-Sent Events: content_extracted, script_generated, audio_started, turn_synthesized, export_finished, completed, failed"
+)
+async def stream_podcast_job_events(job_id: str, last_event_id: Optional[str] = Header(None)):
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Clients reconnecting with Last-Event-ID resume after the last event they saw
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else -1
+    
+    async def event_stream():
+        async for event in job.stream_events(after):
+            yield format_sse(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def follow_podcast_file(job: Job):
+    """Yield the podcast file's bytes as they are written, until the job stops appending to it"""
+    async with expiry_index.async_lease(os.path.dirname(job.audio_path)):
+        f = await asyncio.to_thread(open, job.audio_path, "rb")
+        try:
+            while True:
+                chunk = await asyncio.to_thread(f.read, STREAM_CHUNK_SIZE)
+                if chunk:
+                    yield chunk
+                    continue
+                if not job.audio_in_progress:
+                    return
+                # Each synthesized turn emits an event right after its frames are flushed
+                await job.wait_for_event(timeout=1.0)
+        finally:
+            f.close()
+
+@app.get(
+    "/jobs/{job_id}/audio-stream",
+    summary="Stream a podcast's audio while it is being generated",
+    response_description="A growing MP3 stream that starts as soon as the leading turns are synthesized"
+)
+async def stream_podcast_job_audio(job_id: str):
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Hold the request until the first audio is written or the job ends
+    while job.audio_path is None and not job.finished:
+        await job.wait_for_event(timeout=5.0)
+    
+    if job.audio_path is None or not os.path.exists(job.audio_path):
+        raise HTTPException(status_code=404, detail=job.error or "No audio available for this job")
+    
+    return StreamingResponse(
+        follow_podcast_file(job),
+        media_type=media_type_for(job.audio_path),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.api_route(
+    "/podcasts/{podcast_id}/{filename}",
+    methods=["GET", "HEAD"],
+    summary="Download a generated podcast",
+    response_description="The MP3 file, or the requested byte range of it"
+)
+async def serve_podcast_file(podcast_id: str, filename: str, request: Request):
+    try:
+        uuid.UUID(podcast_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Podcast not found")
+    if not PODCAST_FILE_NAME.match(filename):
+        raise HTTPException(status_code=404, detail="Podcast not found")
+    
+    folder = os.path.join(PODCAST_DIR, podcast_id)
+    try:
+        f = await asyncio.to_thread(open, os.path.join(folder, filename), "rb")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Podcast not found")
+    
+    stat = await asyncio.to_thread(os.fstat, f.fileno())
+    etag = make_etag(stat)
+    # Podcasts never change once published, so caches may keep them until they are deleted
+    deadline = await asyncio.to_thread(expiry_index.deadline, folder)
+    max_age = int(deadline - time.time()) if deadline else 0
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"public, max-age={max_age}, immutable" if max_age > 0 else "no-cache",
+    }
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        f.close()
+        return Response(status_code=304, headers=headers)
+    
+    # A Range is only honoured if the client's copy is still this exact file
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), stat.st_size)
+        except RangeNotSatisfiable:
+            f.close()
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.st_size}"})
+    
+    if byte_range is None:
+        status_code, start, end = 200, 0, stat.st_size - 1
+    else:
+        status_code, (start, end) = 206, byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    
+    if request.method == "HEAD":
+        f.close()
+        return Response(status_code=status_code, headers=headers, media_type=media_type_for(filename))
+    
+    async def send_file():
+        async with expiry_index.async_lease(folder):
+            with f:
+                async for chunk in iter_file_range(f, start, end, FILE_CHUNK_SIZE):
+                    yield chunk
+    
+    return StreamingResponse(send_file(), status_code=status_code, media_type=media_type_for(filename), headers=headers)
+
+@app.get("/tts-cache/stats", summary="TTS phrase cache statistics")
+async def get_tts_cache_stats():
+    if tts_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **tts_cache.stats()}
+
+@app.get("/extraction-cache/stats", summary="Source extraction cache statistics")
+async def get_extraction_cache_stats():
+    return extraction_cache.stats()
+
+@app.get("/workers/stats", summary="CPU worker pool size and queue depth")
+async def get_worker_stats():
+    return worker_pool.stats()
+
+@app.get("/llm/stats", summary="Gemini call concurrency, retries, latency and token usage")
+async def get_llm_stats():
+    return llm_gateway.stats()
+
+@app.get("/expiry/stats", summary="Tracked uploads and podcasts, disk usage and evictions")
+async def get_expiry_stats():
+    return await asyncio.to_thread(expiry_index.stats)
+
+@app.get("/result-cache/stats", summary="Generation result cache statistics")
+async def get_result_cache_stats():
+    if result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **result_cache.stats()}
+
+@app.get("/metrics", summary="Metrics in the Prometheus text format, for this worker process")
+async def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/traces/{trace_id}", summary="Timing spans recorded for one generation (set TRACING_ENABLED)")
+async def get_trace(trace_id: str):
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found" if TRACING_ENABLED else "Tracing is disabled")
+    return trace.to_dict()
+
+@app.get("/warmup", summary="Load heavy dependencies ahead of the first request")
+async def run_warm_up():
+    return {"seconds": round(await warm_up(), 3), "import_seconds": round(IMPORT_SECONDS, 3)}
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    scheduler.shutdown()
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+STARTUP_SECONDS.set(IMPORT_SECONDS, phase="import")
@@ -0,0 +1,106 @@
+"""
+Deterministic local stand-ins for Gemini and edge-tts.
+
+install() swaps them in for genai.GenerativeModel and edge_tts.Communicate,
+so the server's own code runs unchanged without network access or API keys.
+"""
+import asyncio
+import json
+import re
+
+import edge_tts
+import google.generativeai as genai
+
+# One silent MPEG-2 Layer III frame as edge-tts produces it: 24 kHz, 48 kbps, mono, 24 ms
+MP3_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC4]) + bytes(140)
+FRAME_MS = 24
+
+TURN_RANGE = re.compile(r"\((\d+) to (\d+) dialogue turns\)")
+
+class FakeSettings:
+    """Latencies and sizes used by the fakes; changed in place by install()"""
+
+    llm_latency = 0.5  # Seconds until a Gemini response starts
+    llm_chunks = 8  # Streamed responses are split into this many chunks
+    llm_chunk_interval = 0.05  # Seconds between streamed chunks
+    turns = None  # Dialogue turns per script; None follows the range asked for in the prompt
+    words_per_turn = 30
+    tts_latency = 0.2  # Seconds until edge-tts starts sending audio
+    tts_chars_per_second = 15.0  # Speaking rate that decides how much audio a turn produces
+    tts_chunk_frames = 40  # Frames per streamed audio chunk
+
+class FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int = 0, output_tokens: int = 0):
+        self.text = text
+        self.usage_metadata = type("UsageMetadata", (), {
+            "prompt_token_count": prompt_tokens,
+            "candidates_token_count": output_tokens,
+        })()
+
+def fake_script(turns: int, words_per_turn: int) -> list:
+    script = []
+    for i in range(turns):
+        person = "Host" if i % 2 == 0 else "Guest"
+        words = " ".join(f"word{(i * words_per_turn + j) % 97}" for j in range(words_per_turn))
+        script.append({person: {"dialogue": f"Turn {i}. {words}."}})
+    return script
+
+class FakeGenerativeModel:
+    """Answers condensation prompts with shortened text and script prompts with a fixed-shape script"""
+
+    def __init__(self, model_name: str = "gemini-pro", **kwargs):
+        self.model_name = model_name
+
+    def _respond(self, prompt: str) -> str:
+        if "Condense it into dense notes" in prompt:
+            return " ".join(prompt.split()[-400:])
+        turns = FakeSettings.turns
+        if turns is None:
+            match = TURN_RANGE.search(prompt)
+            turns = int(match.group(2)) if match else 12
+        return json.dumps(fake_script(turns, FakeSettings.words_per_turn))
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        await asyncio.sleep(FakeSettings.llm_latency)
+        text = self._respond(prompt)
+        prompt_tokens = len(prompt) // 4
+        if not stream:
+            return FakeResponse(text, prompt_tokens, len(text) // 4)
+
+        async def chunks():
+            size = max(1, len(text) // FakeSettings.llm_chunks + 1)
+            for start in range(0, len(text), size):
+                if start:
+                    await asyncio.sleep(FakeSettings.llm_chunk_interval)
+                yield FakeResponse(text[start:start + size], prompt_tokens, len(text) // 4)
+        return chunks()
+
+class FakeCommunicate:
+    """Streams silent MP3 frames, as many as the text would take to speak"""
+
+    def __init__(self, text: str, voice: str, **kwargs):
+        self.text = text
+        self.voice = voice
+
+    async def stream(self):
+        await asyncio.sleep(FakeSettings.tts_latency)
+        duration_ms = len(self.text) / FakeSettings.tts_chars_per_second * 1000
+        frames = max(1, int(duration_ms // FRAME_MS))
+        for start in range(0, frames, FakeSettings.tts_chunk_frames):
+            count = min(FakeSettings.tts_chunk_frames, frames - start)
+            yield {"type": "audio", "data": MP3_FRAME * count}
+            await asyncio.sleep(0)
+
+    async def save(self, audio_fname: str):
+        with open(audio_fname, "wb") as f:
+            async for chunk in self.stream():
+                f.write(chunk["data"])
+
+def install(**settings):
+    """Replace the Gemini model and edge-tts with the fakes, overriding any FakeSettings given"""
+    for name, value in settings.items():
+        if not hasattr(FakeSettings, name):
+            raise ValueError(f"Unknown fake setting: {name}")
+        setattr(FakeSettings, name, value)
+    genai.GenerativeModel = FakeGenerativeModel
+    edge_tts.Communicate = FakeCommunicate
@@ -0,0 +1,267 @@
+"""
+Offline benchmark of the podcast pipeline.
+
+Gemini and edge-tts are replaced by the local fakes in bench/fakes.py, so
+the numbers reflect the server's own overhead plus the configured fake
+latencies. Run from the server directory:
+
+    python -m bench.run
+    python -m bench.run --scenario api --turns 12,48 --concurrency 1,8 --requests 16
+    python -m bench.run --json results.json
+
+Scenarios:
+    tts  calls script.create_podcast directly with a ready-made script
+    api   drives POST /generate-podcast in-process through the ASGI app
+    jobs  submits to POST /jobs the same way and follows the job's events
+          until it finishes
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Caches would turn repeated runs into lookups, and the production rate limits
+# would measure our quota rather than our code
+BENCH_ENV = {
+    "GEMINI_API_KEY": "bench",
+    "TTS_CACHE_ENABLED": "false",
+    "RESULT_CACHE_ENABLED": "false",
+    "LLM_REQUESTS_PER_MINUTE": "0",
+    "LLM_TOKENS_PER_MINUTE": "0",
+    "MAX_CONCURRENT_JOBS": "1000",
+    "TTS_PER_VOICE_INTERVAL": "0",
+    "LOG_LEVEL": "WARNING",
+}
+
+def percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(samples) -> dict:
+    return {
+        "p50": round(percentile(samples, 0.5), 4),
+        "p95": round(percentile(samples, 0.95), 4),
+        "p99": round(percentile(samples, 0.99), 4),
+        "max": round(max(samples, default=0.0), 4),
+    }
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Not Linux: fall back to the lifetime peak
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+class RssSampler:
+    """Track the peak RSS while a scenario runs"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._task = None
+
+    async def _sample(self):
+        while True:
+            self.peak = max(self.peak, current_rss())
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self):
+        self.peak = current_rss()
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        self.peak = max(self.peak, current_rss())
+
+class StageRecorder:
+    """Collect per-stage durations from every Job the pipeline finishes"""
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+
+    def install(self, job_class):
+        finish_stage = job_class.finish_stage
+        recorder = self
+
+        def recording_finish_stage(job, stage, detail=None):
+            duration = finish_stage(job, stage, detail)
+            recorder.durations[stage].append(duration)
+            return duration
+
+        job_class.finish_stage = recording_finish_stage
+
+    def reset(self):
+        self.durations.clear()
+
+async def run_concurrently(requests: int, concurrency: int, call) -> tuple:
+    """Run call(i) for i in range(requests), at most concurrency at a time; returns (latencies, errors, wall time)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call(i)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors += 1
+                print(f"request {i} failed: {e}", file=sys.__stderr__)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, errors, time.perf_counter() - started
+
+async def bench_tts(turns: int, concurrency: int, requests: int, fakes, script) -> dict:
+    dialogues = fakes.fake_script(turns, fakes.FakeSettings.words_per_turn)
+
+    async def call(i):
+        folder = tempfile.mkdtemp(dir="podcast_output")
+        if not await script.create_podcast(dialogues, "christopher-moore", "aria-reynolds", folder):
+            raise RuntimeError("create_podcast returned no file")
+
+    return await run_concurrently(requests, concurrency, call)
+
+def bench_form(i: int, turns: int, concurrency: int) -> dict:
+    # Distinct text per request so nothing is shared between them
+    text = f"Benchmark article {i}-{turns}-{concurrency}. " + "Some sentence about the topic. " * 200
+    return {"host_name": "christopher-moore", "guest_name": "aria-reynolds", "text_content": text}
+
+async def bench_api(turns: int, concurrency: int, requests: int, fakes, app_module) -> dict:
+    import httpx
+
+    fakes.FakeSettings.turns = turns
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def call(i):
+            response = await client.post("/generate-podcast", data=bench_form(i, turns, concurrency))
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+        return await run_concurrently(requests, concurrency, call)
+
+async def bench_jobs(turns: int, concurrency: int, requests: int, fakes, app_module) -> dict:
+    import httpx
+
+    fakes.FakeSettings.turns = turns
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def call(i):
+            response = await client.post("/jobs", data=bench_form(i, turns, concurrency))
+            if response.status_code != 202:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+            job_id = response.json()["job_id"]
+            # The event stream ends when the job does
+            await client.get(f"/jobs/{job_id}/events")
+            job = (await client.get(f"/jobs/{job_id}")).json()
+            if job["status"] != "completed":
+                raise RuntimeError(f"Job {job['status']}: {job['error']}")
+
+        return await run_concurrently(requests, concurrency, call)
+
+async def run_benchmarks(args) -> list:
+    from bench import fakes
+    fakes.install(llm_latency=args.llm_latency, tts_latency=args.tts_latency, words_per_turn=args.words_per_turn)
+
+    import jobs
+    import script
+    app_module = __import__("app") if {"api", "jobs"} & set(args.scenarios) else None
+    stages = StageRecorder()
+    stages.install(jobs.Job)
+
+    results = []
+    for scenario in args.scenarios:
+        for turns in args.turns:
+            for concurrency in args.concurrency:
+                requests = args.requests or max(4, concurrency * 2)
+                stages.reset()
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    async with RssSampler() as rss:
+                        if scenario == "tts":
+                            latencies, errors, wall = await bench_tts(turns, concurrency, requests, fakes, script)
+                        elif scenario == "api":
+                            latencies, errors, wall = await bench_api(turns, concurrency, requests, fakes, app_module)
+                        else:
+                            latencies, errors, wall = await bench_jobs(turns, concurrency, requests, fakes, app_module)
+                result = {
+                    "scenario": scenario,
+                    "turns": turns,
+                    "concurrency": concurrency,
+                    "requests": requests,
+                    "errors": errors,
+                    "latency": summarize(latencies),
+                    "throughput": round(len(latencies) / wall, 3) if wall else 0.0,
+                    "peak_rss_mb": round(rss.peak / (1024 * 1024), 1),
+                    "stages": {stage: summarize(values) for stage, values in stages.durations.items()},
+                }
+                results.append(result)
+                print_result(result)
+    return results
+
+def print_result(result: dict):
+    latency = result["latency"]
+    print(
+        f"{result['scenario']:<4} turns={result['turns']:<3} c={result['concurrency']:<3} n={result['requests']:<4} "
+        f"p50={latency['p50']:.3f}s p95={latency['p95']:.3f}s p99={latency['p99']:.3f}s "
+        f"{result['throughput']:.2f} req/s  peak RSS {result['peak_rss_mb']} MB"
+        + (f"  errors={result['errors']}" if result["errors"] else "")
+    )
+    for stage, summary in result["stages"].items():
+        print(f"    {stage:<10} p50={summary['p50']:.3f}s p95={summary['p95']:.3f}s max={summary['max']:.3f}s")
+
+def parse_args(argv=None):
+    def int_list(value):
+        return [int(v) for v in value.split(",") if v]
+
+    parser = argparse.ArgumentParser(description="Benchmark the podcast pipeline against local fakes")
+    parser.add_argument("--scenario", default="all", choices=["all", "tts", "api", "jobs"])
+    parser.add_argument("--turns", type=int_list, default=[8, 24, 48], help="Comma-separated script lengths")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16], help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=0, help="Requests per run (default: twice the concurrency, at least 4)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds until a fake Gemini response starts")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="Seconds until fake edge-tts audio starts")
+    parser.add_argument("--words-per-turn", type=int, default=30)
+    parser.add_argument("--keep-limits", action="store_true", help="Keep the configured LLM and TTS rate limits")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+    args.scenarios = ["tts", "api", "jobs"] if args.scenario == "all" else [args.scenario]
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    for name, value in BENCH_ENV.items():
+        if args.keep_limits and name.startswith(("LLM_", "TTS_PER_VOICE")):
+            continue
+        os.environ.setdefault(name, value)
+
+    # Uploads, podcasts, the shared store and caches all go to a scratch directory
+    sys.path.insert(0, SERVER_DIR)
+    with tempfile.TemporaryDirectory(prefix="aximos-bench-") as workdir:
+        os.chdir(workdir)
+        os.makedirs("podcast_output", exist_ok=True)
+        results = asyncio.run(run_benchmarks(args))
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,12 @@
-import google.generativeai as genai
+import asyncio
 import json
+import logging
+import os
+import re
 import time
 from datetime import datetime, timedelta
 
-# Configure the Gemini model
-def setup_model(api_key):
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-pro')
-    return model
+logger = logging.getLogger(__name__)
 
 def get_conversation_length(article_text: str, length_preference: str) -> tuple[int, int]:
     """
@@ -32,7 +31,91 @@ def get_conversation_length(article_text: str, length_preference: str) -> tuple[
     else:  # Long
         return (25, 35)
 
-async def generate_podcast_script(article_text: str, host_name: str, guest_name: str, length: str, model, content_type: str = "article"):
+# Words of source text worth collecting for each length preference; anything beyond
+# this cannot be covered in the conversation and is not extracted
+SOURCE_WORD_BUDGETS = {"Short": 3000, "Medium": 6000, "Long": 12000, "Adaptive": 12000}
+
+def get_source_word_budget(length_preference: str) -> int:
+    return SOURCE_WORD_BUDGETS.get(length_preference, SOURCE_WORD_BUDGETS["Adaptive"])
+
+# Token budget for the content placed in the script prompt; longer inputs are condensed first
+SCRIPT_INPUT_TOKEN_BUDGET = int(os.getenv("SCRIPT_INPUT_TOKEN_BUDGET", "8000"))
+CONDENSE_CHUNK_TOKENS = int(os.getenv("CONDENSE_CHUNK_TOKENS", "6000"))  # Source tokens per condensation call
+CONDENSE_CONCURRENCY = int(os.getenv("CONDENSE_CONCURRENCY", "4"))  # Condensation calls in flight per generation
+CONDENSE_MAX_ROUNDS = 2
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about four characters per token)"""
+    return len(text) // 4
+
+def chunk_text(text: str, max_tokens: int) -> list:
+    """Split text into chunks of about max_tokens, breaking between paragraphs or sentences"""
+    max_chars = max_tokens * 4
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        # Oversized paragraphs (e.g. transcripts without breaks) are split by sentence, then hard-wrapped
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            pieces.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+    
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{piece}" if current else piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+async def condense_chunk(chunk: str, model, content_type: str, target_words: int, semaphore: asyncio.Semaphore) -> str:
+    """Condense one chunk into dense notes; falls back to a truncated chunk if the call fails"""
+    prompt = f"""
+    The following is one part of a longer {content_type}. Condense it into dense notes of at most {target_words} words.
+    Keep every main point, names, numbers, dates, comparisons and one or two short notable quotes verbatim.
+    Do not add commentary or anything that is not in the text. Reply with the notes only.
+
+    Text:
+    {chunk}
+    """
+    async with semaphore:
+        try:
+            response = await model.generate_content_async(prompt)
+            if response.text and response.text.strip():
+                return response.text.strip()
+        except Exception as e:
+            logger.warning(f"Error condensing chunk: {e}")
+    return " ".join(chunk.split()[:target_words])
+
+async def condense_content(article_text: str, model, content_type: str = "article", token_budget: int = SCRIPT_INPUT_TOKEN_BUDGET) -> str:
+    """
+    Fit long content into token_budget with a map-reduce pass.
+
+    The text is split into chunks that are condensed concurrently, and the
+    notes are merged in order. If the merged notes are still over budget,
+    they are condensed again, up to CONDENSE_MAX_ROUNDS rounds.
+    """
+    semaphore = asyncio.Semaphore(CONDENSE_CONCURRENCY)
+    text = article_text
+    for _ in range(CONDENSE_MAX_ROUNDS):
+        if estimate_tokens(text) <= token_budget:
+            break
+        chunks = chunk_text(text, CONDENSE_CHUNK_TOKENS)
+        # Share the budget between chunks; a token is roughly three quarters of a word
+        target_words = max(100, int(token_budget * 0.75 / len(chunks)))
+        logger.info(f"Condensing {estimate_tokens(text)} tokens in {len(chunks)} chunks to ~{target_words} words each")
+        notes = await asyncio.gather(*(
+            condense_chunk(chunk, model, content_type, target_words, semaphore) for chunk in chunks
+        ))
+        text = "\n\n".join(notes)
+    return text
+
+def build_script_prompt(article_text: str, host_name: str, guest_name: str, length: str, content_type: str = "article", turn_range: tuple = None) -> str:
+    """Build the Gemini prompt for a podcast conversation"""
+    min_turns, max_turns = turn_range or get_conversation_length(article_text, length)
     prompt = f"""
     Create a natural, engaging podcast conversation between {host_name} (Host) and {guest_name} (Guest) discussing this {content_type}. 
     The conversation should be formatted as a list of JSON objects.
@@ -40,7 +123,7 @@ async def generate_podcast_script(article_text: str, host_name: str, guest_name:
     Content:
     {article_text}
 
-    Length: {length}
+    Length: {length} ({min_turns} to {max_turns} dialogue turns)
 
     Requirements for the conversation:
     1. Make it dynamic and natural
@@ -84,6 +167,10 @@ async def generate_podcast_script(article_text: str, host_name: str, guest_name:
     ]
     But feel free to be creative in using language as long as it's realistic.
     """
+    return prompt
+
+async def generate_podcast_script(article_text: str, host_name: str, guest_name: str, length: str, model, content_type: str = "article", turn_range: tuple = None):
+    prompt = build_script_prompt(article_text, host_name, guest_name, length, content_type, turn_range)
 
     try:
         response = await model.generate_content_async(prompt)
@@ -93,14 +180,105 @@ async def generate_podcast_script(article_text: str, host_name: str, guest_name:
                 script = json.loads(response.text)
                 return script
             except json.JSONDecodeError as e:
-                print(f"Error parsing JSON: {e}")
-                print("Raw response:", response.text)
+                logger.error(f"Error parsing JSON: {e}")
+                logger.debug(f"Raw response: {response.text}")
                 return None
         else:
-            print("Empty response from model")
+            logger.error("Empty response from model")
             return None
     except Exception as e:
-        print(f"Error generating script: {e}")
-        print("Raw response:", response.text)
+        logger.error(f"Error generating script: {e}")
         return None
 
+class DialogueStreamParser:
+    """
+    Incrementally pull complete dialogue objects out of a JSON array that arrives in pieces.
+
+    Text before the opening bracket (such as a markdown code fence) is ignored.
+    Each top-level object is decoded as soon as its closing brace arrives.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0  # Next character of buffer to scan
+        self.started = False  # Seen the opening bracket of the array
+        self.finished = False  # Seen the closing bracket of the array
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+
+    def feed(self, text: str) -> list:
+        """Add more text and return any dialogue objects it completed"""
+        self.buffer += text
+        dialogues = []
+        while self.pos < len(self.buffer) and not self.finished:
+            char = self.buffer[self.pos]
+            if not self.started:
+                if char == "[":
+                    self.started = True
+                    self.depth = 1
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "[{":
+                if self.depth == 1 and char == "{":
+                    self.object_start = self.pos
+                self.depth += 1
+            elif char in "]}":
+                self.depth -= 1
+                if self.depth == 1 and char == "}" and self.object_start is not None:
+                    dialogue = self._decode(self.buffer[self.object_start:self.pos + 1])
+                    if dialogue:
+                        dialogues.append(dialogue)
+                    self.object_start = None
+                elif self.depth == 0:
+                    self.finished = True
+            self.pos += 1
+
+        # Drop text that has been fully consumed to keep the buffer small
+        keep_from = self.object_start if self.object_start is not None else self.pos
+        self.buffer = self.buffer[keep_from:]
+        self.pos -= keep_from
+        if self.object_start is not None:
+            self.object_start = 0
+        return dialogues
+
+    @staticmethod
+    def _decode(text: str):
+        """Decode one dialogue object, returning None if it is not shaped like {"Host": {"dialogue": "..."}}"""
+        try:
+            dialogue = json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping unparseable dialogue: {e}")
+            return None
+        if not isinstance(dialogue, dict) or not dialogue:
+            return None
+        for content in dialogue.values():
+            if not isinstance(content, dict) or not isinstance(content.get("dialogue"), str):
+                return None
+        return dialogue
+
+async def stream_podcast_script(article_text: str, host_name: str, guest_name: str, length: str, model, content_type: str = "article", turn_range: tuple = None):
+    """Generate a podcast script with a streaming Gemini call, yielding each dialogue as soon as it is complete"""
+    prompt = build_script_prompt(article_text, host_name, guest_name, length, content_type, turn_range)
+    parser = DialogueStreamParser()
+    
+    response = await model.generate_content_async(prompt, stream=True)
+    async for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. safety metadata) carry nothing to parse
+            continue
+        for dialogue in parser.feed(text):
+            yield dialogue
+    
+    if not parser.started:
+        raise ValueError("Model response did not contain a JSON array")
@@ -0,0 +1,419 @@
+import asyncio
+import time
+import uuid
+import json
+import logging
+import os
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+
+from utils.metrics import Counter, Histogram, tracer
+from utils.store import SharedStore
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in execution order, with the share of total work each one represents
+STAGES = ["extract", "condense", "script", "synthesize", "finalize"]
+STAGE_WEIGHTS = {"extract": 0.1, "condense": 0.1, "script": 0.25, "synthesize": 0.5, "finalize": 0.05}
+
+# Snapshots of a running job are written to the shared store at most this often
+PERSIST_INTERVAL = float(os.getenv("JOB_PERSIST_INTERVAL", "0.25"))
+
+STAGE_SECONDS = Histogram("aximos_stage_seconds", "Duration of each pipeline stage", ["stage"])
+GENERATION_FAILURES = Counter("aximos_generation_failures_total", "Failed generations by the stage they failed in", ["stage"])
+
+class Job:
+    """State of a single podcast generation, updated by the pipeline as it runs"""
+
+    def __init__(self, job_id: Optional[str] = None, store: Optional[SharedStore] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.store = store  # Shared store other workers read this job from, if any
+        self.status = "queued"  # queued -> running -> completed | failed
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stages = {
+            stage: {"status": "pending", "started_at": None, "finished_at": None, "detail": None}
+            for stage in STAGES
+        }
+        self.current_stage = None
+        self.turns_total = 0
+        self.turns_done = 0
+        self.result = None
+        self.error = None
+        self.audio_path = None  # Output file, set as soon as audio starts being written
+        self.followers: List["Job"] = []  # Jobs coalesced onto this one, which share its output
+        self.events: List[Dict[str, Any]] = []
+        self._event_waiter = None
+        self._unsaved_events: List[Dict[str, Any]] = []
+        self._version = 0  # Bumped on every change, so flush knows which write it needs
+        self._saved_version = 0
+        self._save_waiters: List[Tuple[int, asyncio.Future]] = []
+        self._saver = None
+
+    def emit(self, event: str, **data):
+        """Record a progress event and wake up anyone streaming this job's events"""
+        record = {
+            "id": len(self.events),
+            "event": event,
+            "data": {"job_id": self.id, "elapsed": round(time.time() - self.created_at, 3), **data},
+        }
+        self.events.append(record)
+        self.persist(record)
+        waiter, self._event_waiter = self._event_waiter, None
+        if waiter is not None:
+            waiter.set()
+
+    def persist(self, event: Optional[Dict[str, Any]] = None):
+        """
+        Publish the current state, and the event that changed it, to the shared store.
+
+        Writes happen in a thread and are coalesced: each one stores the latest
+        snapshot with every event since the previous write, at most once per
+        PERSIST_INTERVAL while the job runs.
+        """
+        if self.store is None:
+            return
+        if event is not None:
+            self._unsaved_events.append(event)
+        self._version += 1
+        if self._saver is None or self._saver.done():
+            self._saver = asyncio.get_running_loop().create_task(self._save())
+
+    async def _save(self):
+        try:
+            while self._saved_version < self._version:
+                version = self._version
+                events, self._unsaved_events = self._unsaved_events, []
+                # Serialized here, as the pipeline keeps changing the job while the write runs
+                snapshot = json.dumps(self.to_dict())
+                try:
+                    await asyncio.to_thread(
+                        self.store.save_job, self.id, self.status, self.audio_path, snapshot, self.finished_at, events
+                    )
+                except Exception as e:
+                    logger.warning(f"Could not save job {self.id}: {e}")
+                self._saved_version = version
+                self._wake_save_waiters()
+                if not self.finished:
+                    await asyncio.sleep(PERSIST_INTERVAL)
+        finally:
+            # A cancelled saver must not leave flush waiting forever
+            self._wake_save_waiters(all_waiters=True)
+
+    def _wake_save_waiters(self, all_waiters: bool = False):
+        pending = []
+        for version, waiter in self._save_waiters:
+            if all_waiters or version <= self._saved_version:
+                if not waiter.done():
+                    waiter.set_result(None)
+            else:
+                pending.append((version, waiter))
+        self._save_waiters = pending
+
+    async def flush(self):
+        """Wait until the job's state as of now is in the shared store"""
+        if self._saved_version >= self._version or self._saver is None or self._saver.done():
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._save_waiters.append((self._version, waiter))
+        await waiter
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    @property
+    def audio_in_progress(self) -> bool:
+        """
+        Whether the output file may still be appended to.
+
+        The path is published before the first turn is written, so this holds
+        from then until the job finishes rather than following a stage.
+        """
+        return self.audio_path is not None and not self.finished
+
+    def set_audio_path(self, path: str):
+        self.audio_path = path
+        self.emit("audio_started", stream_url=f"/jobs/{self.id}/audio-stream")
+        for follower in self.followers:
+            follower.set_audio_path(path)
+
+    def add_follower(self, job: "Job"):
+        """Relay this job's output file and turn progress to job, which waits on the same result"""
+        self.followers.append(job)
+        job.turns_done, job.turns_total = self.turns_done, self.turns_total
+        if self.audio_path is not None:
+            job.set_audio_path(self.audio_path)
+
+    async def wait_for_event(self, timeout: float) -> bool:
+        """Wait until the next event is emitted; returns False if timeout passes first"""
+        if self._event_waiter is None:
+            self._event_waiter = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._event_waiter.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stream_events(self, after: int = -1, keepalive: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield events with an id greater than after, waiting for new ones until the job finishes.
+
+        None is yielded whenever keepalive seconds pass without a new event.
+        """
+        next_id = after + 1
+        while True:
+            while next_id < len(self.events):
+                yield self.events[next_id]
+                next_id += 1
+            if self.finished:
+                return
+            if not await self.wait_for_event(keepalive):
+                yield None
+
+    def start_stage(self, stage: str, detail: Any = None, exclusive: bool = True):
+        """Mark a stage as running; unless exclusive is False, the current stage is finished first"""
+        if exclusive and self.current_stage and self.stages[self.current_stage]["status"] == "running":
+            self.finish_stage(self.current_stage)
+        self.current_stage = stage
+        self.stages[stage].update(status="running", started_at=time.time(), detail=detail)
+        self.persist()
+
+    def finish_stage(self, stage: str, detail: Any = None) -> float:
+        """Mark a stage as done and return how long it took in seconds"""
+        state = self.stages[stage]
+        state["status"] = "done"
+        state["finished_at"] = time.time()
+        if detail is not None:
+            state["detail"] = detail
+        duration = state["finished_at"] - (state["started_at"] or state["finished_at"])
+        if state["started_at"]:
+            STAGE_SECONDS.observe(duration, stage=stage)
+            tracer.record(f"stage:{stage}", state["started_at"], duration)
+        return round(duration, 3)
+
+    def turn_done(self, completed: int, total: int, turn: Dict[str, Any] = None, ok: bool = True):
+        for follower in self.followers:
+            follower.turn_done(completed, total, turn, ok)
+        self.turns_done = completed
+        self.turns_total = total
+        if turn is not None:
+            self.emit(
+                "turn_synthesized",
+                index=turn["index"],
+                person=turn["person"],
+                ok=ok,
+                completed=completed,
+                total=total,
+            )
+
+    @property
+    def progress(self) -> float:
+        """Fraction of the pipeline completed, between 0 and 1"""
+        if self.status == "completed":
+            return 1.0
+        done = 0.0
+        for stage in STAGES:
+            state = self.stages[stage]["status"]
+            if state == "done":
+                done += STAGE_WEIGHTS[stage]
+            elif state == "running" and stage == "synthesize" and self.turns_total:
+                done += STAGE_WEIGHTS[stage] * self.turns_done / self.turns_total
+        return min(done, 0.99)
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time extrapolated from elapsed time and progress so far"""
+        if self.status != "running" or not self.started_at:
+            return None
+        progress = self.progress
+        if progress < 0.05:
+            return None
+        elapsed = time.time() - self.started_at
+        return round(elapsed * (1 - progress) / progress, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.current_stage,
+            "stages": self.stages,
+            "progress": round(self.progress * 100, 1),
+            "eta_seconds": self.eta_seconds,
+            "turns_done": self.turns_done,
+            "turns_total": self.turns_total,
+            "audio_stream_url": f"/jobs/{self.id}/audio-stream" if self.audio_path else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+def format_sse(event: Optional[Dict[str, Any]]) -> str:
+    """Serialize an event for a text/event-stream response; None becomes a keepalive comment"""
+    if event is None:
+        return ": keepalive\n\n"
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+class RemoteJob:
+    """Read-only view of a job owned by another worker process, polled from the shared store"""
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, store: SharedStore, job_id: str, row):
+        self.store = store
+        self.id = job_id
+        self._apply(row)
+
+    @classmethod
+    async def load(cls, store: SharedStore, job_id: str) -> Optional["RemoteJob"]:
+        row = await asyncio.to_thread(store.load_job, job_id)
+        return cls(store, job_id, row) if row is not None else None
+
+    def _apply(self, row):
+        self.status = row["status"]
+        self.audio_path = row["audio_path"]
+        self.finished_at = row["finished_at"]
+        self.snapshot = json.loads(row["snapshot"])
+        self.error = self.snapshot.get("error")
+
+    async def refresh(self):
+        row = await asyncio.to_thread(self.store.load_job, self.id)
+        if row is not None:
+            self._apply(row)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    @property
+    def audio_in_progress(self) -> bool:
+        return self.audio_path is not None and not self.finished
+
+    async def wait_for_event(self, timeout: float) -> bool:
+        await asyncio.sleep(min(timeout, self.POLL_INTERVAL))
+        await self.refresh()
+        return True
+
+    async def stream_events(self, after: int = -1, keepalive: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Same contract as Job.stream_events, by polling the store"""
+        idle = 0.0
+        while True:
+            # Status first: events are stored in the same transaction as the state they lead to
+            await self.refresh()
+            events = await asyncio.to_thread(self.store.job_events, self.id, after)
+            for event in events:
+                yield event
+                after = event["id"]
+            if self.finished:
+                return
+            idle = 0.0 if events else idle + self.POLL_INTERVAL
+            if idle >= keepalive:
+                idle = 0.0
+                yield None
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.snapshot
+
+class JobManager:
+    """
+    Run generation jobs in the background with bounded concurrency and keep their results for a while.
+
+    With a shared store, job state is published there so any worker can
+    answer status, event and audio stream requests for it.
+    """
+
+    def __init__(self, max_concurrent: int, retention_seconds: float, store: Optional[SharedStore] = None):
+        self.max_concurrent = max(1, max_concurrent)
+        self.retention_seconds = retention_seconds
+        self.store = store
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._semaphore = None
+
+    async def submit(self, runner: Callable[[Job], Awaitable[Dict[str, Any]]], gate: Optional[asyncio.Semaphore] = None) -> Job:
+        """
+        Queue runner(job) in the background and return the job once other workers can see it.
+
+        If gate is given, the job also waits for it before taking a slot, which
+        caps how many jobs of one group (e.g. a batch) run at once.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._prune()
+
+        job = Job(store=self.store)
+        job.persist()
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job, runner, gate))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        await job.flush()
+        return job
+
+    async def _run(self, job: Job, runner: Callable[[Job], Awaitable[Dict[str, Any]]], gate: Optional[asyncio.Semaphore]):
+        async with gate or nullcontext(), self._semaphore:
+            job.status = "running"
+            job.started_at = time.time()
+            job.persist()
+            try:
+                job.result = await runner(job)
+                if job.current_stage and job.stages[job.current_stage]["status"] == "running":
+                    job.finish_stage(job.current_stage)
+                job.status = "completed"
+                job.emit("completed")
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Job was cancelled"
+                raise
+            except HTTPException as e:
+                job.status = "failed"
+                job.error = str(e.detail)
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                if job.status == "failed":
+                    GENERATION_FAILURES.inc(stage=job.current_stage or "queued")
+                    if job.current_stage:
+                        job.stages[job.current_stage]["status"] = "failed"
+                job.finished_at = time.time()
+                if job.status == "failed":
+                    job.emit("failed", stage=job.current_stage, error=job.error)
+                else:
+                    job.persist()
+
+    async def get(self, job_id: str) -> Union[Job, RemoteJob, None]:
+        self._prune()
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            return await RemoteJob.load(self.store, job_id)
+        return job
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == "queued")
+
+    @property
+    def running(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == "running")
+
+    def _prune(self):
+        """Forget finished jobs once their retention period has passed"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def shutdown(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Let other workers see how the cancelled jobs ended
+        await asyncio.gather(*(job.flush() for job in self._jobs.values()), return_exceptions=True)
@@ -0,0 +1,310 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, AsyncIterator, Optional
+
+from utils.metrics import Counter, Gauge, Histogram, tracer
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-pro")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # Gemini calls in flight across all requests
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))  # Request quota; 0 disables the limit
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))  # Input token quota; 0 disables the limit
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))  # Seconds; doubles on every retry
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "30"))
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "120"))  # Seconds for a full response, or a stream's first chunk
+
+@lru_cache(maxsize=None)
+def retryable_errors() -> tuple:
+    """Errors worth another attempt: quota exhaustion, overload and transport hiccups"""
+    # The Google SDK takes most of a second to import, so it is loaded on first use
+    from google.api_core import exceptions as google_exceptions
+
+    return (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.Aborted,
+        asyncio.TimeoutError,
+        ConnectionError,
+    )
+
+LLM_CALL_SECONDS = Histogram("aximos_llm_call_seconds", "Gemini call latency, to the end of the response", ["mode"])
+LLM_QUEUE_SECONDS = Histogram("aximos_llm_queue_seconds", "Time Gemini calls waited for a concurrency slot and rate limit capacity")
+LLM_RETRIES = Counter("aximos_llm_retries_total", "Gemini calls retried after a transient or quota error")
+LLM_FAILURES = Counter("aximos_llm_failures_total", "Gemini calls that failed for good")
+LLM_TOKENS = Counter("aximos_llm_tokens_total", "Tokens reported by Gemini", ["kind"])
+LLM_IN_FLIGHT = Gauge("aximos_llm_in_flight", "Gemini calls currently running")
+
+def estimate_prompt_tokens(prompt: Any) -> int:
+    """Rough token count of a text prompt (about four characters per token)"""
+    return len(prompt) // 4 if isinstance(prompt, str) else 0
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at rate tokens per second.
+
+    Waiters are served in arrival order, so a burst queues up behind the
+    bucket instead of failing. A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = None
+        self._lock = None
+
+    def _refill(self, now: float):
+        if self._updated is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Requests larger than the bucket would never fit; let them drain it completely instead
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            self._refill(loop.time())
+            if self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill(loop.time())
+            self._tokens -= amount
+
+class LLMMetrics:
+    """Call counts, retries, token usage and a window of recent latencies"""
+
+    def __init__(self, window: int = 500):
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=window)
+        self.queue_waits = deque(maxlen=window)
+
+    def record_usage(self, response: Any):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+            output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+            LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+            LLM_TOKENS.inc(output_tokens, kind="output")
+
+    def record_latency(self, mode: str, started: float):
+        """Record a completed call that started at time.perf_counter() value started"""
+        duration = time.perf_counter() - started
+        self.latencies.append(duration)
+        LLM_CALL_SECONDS.observe(duration, mode=mode)
+        tracer.record("llm", time.time() - duration, duration, mode=mode)
+
+    def record_failure(self):
+        self.failures += 1
+        LLM_FAILURES.inc()
+
+    @staticmethod
+    def _percentile(samples, fraction: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_p50": self._percentile(self.latencies, 0.5),
+            "latency_p95": self._percentile(self.latencies, 0.95),
+            "queue_wait_p95": self._percentile(self.queue_waits, 0.95),
+        }
+
+class LLMGateway:
+    """
+    Process-wide entry point for Gemini calls.
+
+    The SDK is configured and the model built once, on first use. Every call
+    waits for a concurrency slot and for the request and token buckets, and
+    retries transient or quota errors with jittered exponential backoff.
+    Streams are retried only until their first chunk arrives, since chunks
+    already handed to the caller cannot be taken back.
+
+    generate_content_async mirrors GenerativeModel's, so the gateway can be
+    passed anywhere a model is expected.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_concurrency: int,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_retries: int,
+        retry_base_delay: float,
+        retry_max_delay: float,
+        call_timeout: float,
+    ):
+        self.model_name = model_name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.call_timeout = call_timeout
+        self.request_bucket = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 60 * 5))
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, tokens_per_minute / 6)
+        self.metrics = LLMMetrics()
+        self.in_flight = 0
+        self.waiting = 0
+        self._model = None
+        self._semaphore = None
+        LLM_IN_FLIGHT.set_function(lambda: self.in_flight)
+
+    @property
+    def model(self):
+        if self._model is None:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise RuntimeError("GEMINI_API_KEY is not set")
+            import google.generativeai as genai
+
+            genai.configure(api_key=api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retries from many requests from arriving in lockstep
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    async def _acquire(self, prompt: Any):
+        """Wait for a concurrency slot and rate limit capacity; returns the time spent waiting"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+            try:
+                await self.request_bucket.acquire()
+                await self.token_bucket.acquire(estimate_prompt_tokens(prompt))
+            except BaseException:
+                self._semaphore.release()
+                raise
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        wait = time.perf_counter() - started
+        self.metrics.queue_waits.append(wait)
+        LLM_QUEUE_SECONDS.observe(wait)
+        return wait
+
+    def _release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def _retry_or_raise(self, attempt: int, error: Exception):
+        if not isinstance(error, retryable_errors()) or attempt >= self.max_retries:
+            self.metrics.record_failure()
+            raise error
+        delay = self._backoff(attempt)
+        self.metrics.retries += 1
+        LLM_RETRIES.inc()
+        logger.warning(f"Gemini call failed ({error.__class__.__name__}: {error}); retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    async def generate_content_async(self, prompt: Any, stream: bool = False, **kwargs):
+        if stream:
+            return self._stream(prompt, **kwargs)
+
+        attempt = 0
+        while True:
+            await self._acquire(prompt)
+            started = time.perf_counter()
+            try:
+                self.metrics.calls += 1
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, **kwargs),
+                    timeout=self.call_timeout
+                )
+                self.metrics.record_latency("single", started)
+                self.metrics.record_usage(response)
+                return response
+            except Exception as e:
+                error = e
+            finally:
+                self._release()
+            # Back off without holding a concurrency slot
+            await self._retry_or_raise(attempt, error)
+            attempt += 1
+
+    async def _stream(self, prompt: Any, **kwargs) -> AsyncIterator[Any]:
+        attempt = 0
+        while True:
+            await self._acquire(prompt)
+            started = time.perf_counter()
+            received = False
+            error = None
+            try:
+                self.metrics.calls += 1
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, stream=True, **kwargs),
+                    timeout=self.call_timeout
+                )
+                chunks = response.__aiter__()
+                last_chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.call_timeout)
+                received = True
+                yield last_chunk
+                async for chunk in chunks:
+                    last_chunk = chunk
+                    yield chunk
+                self.metrics.record_latency("stream", started)
+                # Usage is reported on the final chunk of a stream
+                self.metrics.record_usage(last_chunk)
+                return
+            except StopAsyncIteration:
+                self.metrics.record_latency("stream", started)
+                return
+            except Exception as e:
+                if received:
+                    self.metrics.record_failure()
+                    raise
+                error = e
+            finally:
+                self._release()
+            await self._retry_or_raise(attempt, error)
+            attempt += 1
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            **self.metrics.to_dict(),
+        }
+
+llm_gateway = LLMGateway(
+    GEMINI_MODEL,
+    LLM_MAX_CONCURRENCY,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    LLM_CALL_TIMEOUT,
+)
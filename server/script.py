@@ -1,11 +1,38 @@
 import os
 import asyncio
-import edge_tts
 import shutil
-from pydub import AudioSegment
-from pydub.playback import play
-from generate import generate_podcast_script, setup_model
+import time
 import uuid
+from contextlib import asynccontextmanager
+import logging
+from utils.mp3 import Mp3Writer
+from utils.encoding import AudioFormat, FfmpegEncoder
+from utils.tts_cache import TTSCache
+from utils.metrics import Counter, Gauge, Histogram, timed, tracer
+
+logger = logging.getLogger(__name__)
+
+TTS_TURN_SECONDS = Histogram("aximos_tts_turn_seconds", "Time to synthesize one dialogue turn with edge-tts, excluding queueing")
+TTS_TURNS = Counter("aximos_tts_turns_total", "Dialogue turns by how their audio was obtained", ["outcome"])
+TTS_IN_FLIGHT = Gauge("aximos_tts_in_flight", "edge-tts requests currently running")
+TURNS_SKIPPED = Counter("aximos_turns_skipped_total", "Dialogue turns left out of a podcast because no audio was produced")
+ASSEMBLY_SECONDS = Histogram("aximos_assembly_seconds", "Time spent appending clips to the output MP3, per podcast")
+EXPORT_SECONDS = Histogram("aximos_export_seconds", "Time to close and finalize the output MP3, per podcast")
+
+PAUSE_MS = 500  # Silence inserted after each dialogue turn
+
+# How clips are assembled: "frames" appends MP3 frames as they arrive, "pcm" decodes
+# and mixes them with NumPy for variable gaps, overlapping interjections and level matching
+AUDIO_MIXER = os.getenv("AUDIO_MIXER", "frames").lower()
+MIX_TARGET_DBFS = float(os.getenv("MIX_TARGET_DBFS", "-20"))  # Speech level each voice is matched to
+MIX_INTERJECTION_WORDS = int(os.getenv("MIX_INTERJECTION_WORDS", "3"))  # Turns this short may overlap the previous one
+MIX_OVERLAP_MS = int(os.getenv("MIX_OVERLAP_MS", "300"))
+MIX_DUCK_DB = float(os.getenv("MIX_DUCK_DB", "8"))  # How far a speaker is lowered under an interjection
+if AUDIO_MIXER == "pcm":
+    from utils.mixer import PcmMixer  # Needs numpy and ffmpeg
+
+# ffmpeg runs for the pcm mixer and for any output other than passthrough MP3
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
 
 # Voice configurations
 HOST_VOICES = [
@@ -26,6 +53,63 @@ GUEST_VOICES = [
     {"name": "AriaNeural", "locale": "en-US", "gender": "Female"}
 ]
 
+# Text-to-speech concurrency settings
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "6"))  # Max TTS requests in flight across all voices
+TTS_PER_VOICE_CONCURRENCY = int(os.getenv("TTS_PER_VOICE_CONCURRENCY", "3"))  # Max TTS requests in flight per voice
+TTS_PER_VOICE_INTERVAL = float(os.getenv("TTS_PER_VOICE_INTERVAL", "0.1"))  # Min seconds between request starts per voice
+TTS_TURN_TIMEOUT = float(os.getenv("TTS_TURN_TIMEOUT", "60"))  # Seconds before a single turn is given up on
+TTS_LOOKAHEAD = int(os.getenv("TTS_LOOKAHEAD", "12"))  # Max turns scheduled ahead of the one being written
+# Stream edge-tts audio straight into memory instead of writing per-turn MP3 files
+TTS_IN_MEMORY = os.getenv("TTS_IN_MEMORY", "true").lower() in ("1", "true", "yes")
+
+# Prosody settings passed to edge-tts; these are part of the TTS cache key
+TTS_PARAMS = {"rate": "+0%", "volume": "+0%", "pitch": "+0Hz"}
+TTS_OUTPUT_FORMAT = "audio-24khz-48kbitrate-mono-mp3"  # edge-tts' fixed output format
+
+# Phrase cache for synthesized audio
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "200"))
+TTS_CACHE_MAX_CHARS = int(os.getenv("TTS_CACHE_MAX_CHARS", "120"))  # Only cache phrases up to this length
+
+tts_cache = TTSCache(TTS_CACHE_DIR, int(TTS_CACHE_MAX_MB * 1024 * 1024)) if TTS_CACHE_ENABLED else None
+tts_inflight = {}  # cache key -> task synthesizing that phrase
+
+class VoiceRateLimiter:
+    """Bound concurrent TTS requests overall and per voice, and space out request starts per voice"""
+
+    def __init__(self, max_concurrency: int, per_voice_concurrency: int, per_voice_interval: float):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_voice_concurrency = max(1, per_voice_concurrency)
+        self.per_voice_interval = max(0.0, per_voice_interval)
+        # Semaphores are created lazily so they bind to the running event loop
+        self._global = None
+        self._voices = {}
+        self._next_start = {}
+
+    async def _wait_for_turn(self, voice: str):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self._next_start.get(voice, 0.0))
+        self._next_start[voice] = start + self.per_voice_interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    @asynccontextmanager
+    async def slot(self, voice: str):
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrency)
+        if voice not in self._voices:
+            self._voices[voice] = asyncio.Semaphore(self.per_voice_concurrency)
+
+        # Take the per-voice slot first so waiting on a busy voice never holds a global slot
+        async with self._voices[voice]:
+            await self._wait_for_turn(voice)
+            async with self._global:
+                yield
+
+tts_limiter = VoiceRateLimiter(TTS_CONCURRENCY, TTS_PER_VOICE_CONCURRENCY, TTS_PER_VOICE_INTERVAL)
+
 def get_voice_by_name(name: str) -> dict:
     """Get voice configuration by name."""
     for voice in HOST_VOICES + GUEST_VOICES:
@@ -34,20 +118,32 @@ def get_voice_by_name(name: str) -> dict:
     return None
 
 async def text_to_speech(text, voice, output_file):
+    import edge_tts  # Imported on first use to keep startup fast
     try:
-        print(f"Generating speech with voice {voice}")
-        communicate = edge_tts.Communicate(text, voice)
+        communicate = edge_tts.Communicate(text, voice, **TTS_PARAMS)
         await communicate.save(output_file)
-        print(f"Successfully saved audio to {output_file}")
+        logger.debug(f"Saved audio with voice {voice} to {output_file}")
         return True
     except Exception as e:
-        print(f"Error in text_to_speech: {str(e)}")
+        logger.warning(f"Error in text_to_speech: {str(e)}")
         return False
 
+async def text_to_speech_bytes(text: str, voice: str) -> bytes:
+    """Synthesize speech and collect the edge-tts audio stream into memory"""
+    import edge_tts
+    try:
+        communicate = edge_tts.Communicate(text, voice, **TTS_PARAMS)
+        audio = bytearray()
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio.extend(chunk["data"])
+        return bytes(audio)
+    except Exception as e:
+        logger.warning(f"Error in text_to_speech_bytes: {str(e)}")
+        return b""
+
 def get_voice_for_person(person: str, name: str) -> str:
     """Get the appropriate voice based on the person's role and name"""
-    print(f"Getting voice for {person} with name {name}")
-    
     # Map frontend IDs to voice names
     voice_map = {
         # Host voices
@@ -82,12 +178,11 @@ def clean_output_folder(folder_path):
     """Clean the output folder by removing and recreating it"""
     try:
         if os.path.exists(folder_path):
-            print(f"Cleaning output folder: {folder_path}")
+            logger.debug(f"Cleaning output folder: {folder_path}")
             shutil.rmtree(folder_path)
         os.makedirs(folder_path)
-        print(f"Created clean output folder: {folder_path}")
     except Exception as e:
-        print(f"Error in clean_output_folder: {str(e)}")
+        logger.error(f"Error in clean_output_folder: {str(e)}")
         raise
 
 def cleanup_dialogue_files(output_folder):
@@ -97,106 +192,242 @@ def cleanup_dialogue_files(output_folder):
             if not file.startswith("podcast_"):
                 file_path = os.path.join(output_folder, file)
                 os.remove(file_path)
-        print("Cleaned up individual dialogue files")
+        logger.debug("Cleaned up individual dialogue files")
     except Exception as e:
-        print(f"Error in cleanup_dialogue_files: {str(e)}")
+        logger.warning(f"Error in cleanup_dialogue_files: {str(e)}")
 
-async def generate_dialogue_audio(text: str, voice: str, output_file: str) -> AudioSegment:
-    """Generate audio for a single dialogue"""
+async def generate_dialogue_audio(text: str, voice: str, output_file: str) -> bytes:
+    """Generate MP3 audio for a single dialogue"""
+    if TTS_IN_MEMORY:
+        return await generate_dialogue_audio_in_memory(text, voice)
+    
     success = await text_to_speech(text, voice, output_file)
     if not success:
-        print(f"Failed to generate audio for: {text}")
+        logger.warning(f"Failed to generate audio for: {text[:50]}")
         return None
     
     if not os.path.exists(output_file):
-        print(f"Generated file doesn't exist: {output_file}")
+        logger.warning(f"Generated file doesn't exist: {output_file}")
+        return None
+    
+    if os.path.getsize(output_file) == 0:
+        logger.warning(f"Generated file is empty: {output_file}")
         return None
     
-    file_size = os.path.getsize(output_file)
-    if file_size == 0:
-        print(f"Generated file is empty: {output_file}")
+    with open(output_file, "rb") as f:
+        return f.read()
+
+async def generate_dialogue_audio_in_memory(text: str, voice: str) -> bytes:
+    """Generate MP3 audio for a single dialogue without touching the disk"""
+    audio_bytes = await text_to_speech_bytes(text, voice)
+    if not audio_bytes:
+        logger.warning(f"Failed to generate audio for: {text[:50]}")
         return None
     
-    print(f"Generated file size: {file_size} bytes")
+    return audio_bytes
+
+async def synthesize_uncached(turn: dict, cache_key: str = None) -> bytes:
+    """Call edge-tts for a single turn, returning None instead of raising on failure"""
+    person, i, text = turn["person"], turn["index"], turn["text"]
+    try:
+        async with tts_limiter.slot(turn["voice"]):
+            logger.debug(f"Processing {person} dialogue {i}: {text[:50]}...")
+            with TTS_IN_FLIGHT.track_in_progress(), timed(TTS_TURN_SECONDS, "tts"):
+                audio = await asyncio.wait_for(
+                    generate_dialogue_audio(text, turn["voice"], turn["audio_file"]),
+                    timeout=TTS_TURN_TIMEOUT
+                )
+        TTS_TURNS.inc(outcome="synthesized" if audio else "failed")
+        if audio and cache_key:
+            await asyncio.to_thread(tts_cache.put, cache_key, audio)
+        return audio
+    except asyncio.TimeoutError:
+        TTS_TURNS.inc(outcome="timeout")
+        logger.warning(f"Timed out generating audio for {person} dialogue {i}")
+    except Exception as e:
+        TTS_TURNS.inc(outcome="failed")
+        logger.warning(f"Error generating audio for dialogue: {str(e)}")
+    return None
+
+async def synthesize_turn(turn: dict) -> bytes:
+    """Synthesize a single dialogue turn, using the phrase cache for short phrases"""
+    text = turn["text"]
+    if tts_cache is None or len(text) > TTS_CACHE_MAX_CHARS:
+        return await synthesize_uncached(turn)
+    
+    cache_key = TTSCache.make_key(turn["voice"], text, {**TTS_PARAMS, "format": TTS_OUTPUT_FORMAT})
+    cached = await asyncio.to_thread(tts_cache.get, cache_key)
+    if cached:
+        logger.debug(f"TTS cache hit for {turn['person']} dialogue {turn['index']}: {text[:50]}")
+        TTS_TURNS.inc(outcome="cached")
+        return cached
+    
+    # Identical phrases requested at the same time share one edge-tts call
+    task = tts_inflight.get(cache_key)
+    if task is None:
+        task = asyncio.create_task(synthesize_uncached(turn, cache_key))
+        tts_inflight[cache_key] = task
+        task.add_done_callback(lambda _: tts_inflight.pop(cache_key, None))
+    return await asyncio.shield(task)
+
+async def iter_turns(dialogues, host_name: str, guest_name: str, output_folder: str):
+    """Expand dialogues, given as a list or an async iterable, into individual turns"""
+    async def aiter_dialogues():
+        if hasattr(dialogues, "__aiter__"):
+            async for dialogue in dialogues:
+                yield dialogue
+        else:
+            for dialogue in dialogues:
+                yield dialogue
+    
+    i = 0
+    async for dialogue in aiter_dialogues():
+        for person, content in dialogue.items():
+            name = host_name if person == "Host" else guest_name
+            yield {
+                "index": i,
+                "person": person,
+                "text": content["dialogue"],
+                "voice": get_voice_for_person(person, name),
+                "audio_file": os.path.join(output_folder, f"{person}_{i}.mp3"),
+            }
+        i += 1
+
+async def synthesize_in_order(turns, seen: list = None):
+    """
+    Synthesize turns concurrently but yield their audio in script order.
     
-    audio_clip = AudioSegment.from_file(output_file)
+    turns is an async iterator, so synthesis can start while later turns are
+    still being generated. Only a bounded window of turns is scheduled ahead
+    of the one being yielded, so finished-but-not-yet-written clips never
+    pile up. Every scheduled turn is appended to seen, if given.
+    """
+    lookahead = max(TTS_LOOKAHEAD, tts_limiter.max_concurrency)
+    pending = asyncio.Queue(maxsize=lookahead)
     
-    if len(audio_clip) == 0:
-        print(f"Generated audio clip is empty")
-        return None
+    async def schedule():
+        try:
+            async for turn in turns:
+                if seen is not None:
+                    seen.append(turn)
+                await pending.put((turn, asyncio.create_task(synthesize_turn(turn))))
+            await pending.put(None)
+        except Exception as e:
+            await pending.put(e)
     
-    print(f"Successfully generated audio clip of length {len(audio_clip)}ms")
-    return audio_clip + AudioSegment.silent(duration=500)  # Add 500ms pause
+    producer = asyncio.create_task(schedule())
+    try:
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            turn, task = item
+            yield turn, await task
+    finally:
+        producer.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if isinstance(item, tuple):
+                item[1].cancel()
 
-async def create_podcast(dialogues, host_name: str, guest_name: str, output_folder: str):
-    """Create a podcast from dialogues"""
-    print(f"\nStarting podcast creation with host: {host_name}, guest: {guest_name}")
-    print(f"Using output folder: {output_folder}")
+async def create_podcast(dialogues, host_name: str, guest_name: str, output_folder: str, on_turn=None, on_output=None, audio_format: AudioFormat = None):
+    """
+    Create a podcast from dialogues.
     
+    dialogues may be a list or an async iterable that yields dialogues as they
+    are generated. on_turn, if given, is called as on_turn(completed, total, turn, ok)
+    after each turn is processed, in script order, where total counts the turns
+    known so far. on_output, if given, is called with the output path once the
+    file is created, so it can be streamed while it grows. The podcast is
+    written as audio_format, by default edge-tts' own MP3.
+    """
+    audio_format = audio_format or AudioFormat()
     try:
         # No need to clean the folder as it's newly created
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
     except Exception as e:
-        print(f"Failed to create output folder: {str(e)}")
+        logger.error(f"Failed to create output folder: {str(e)}")
         return None
     
-    audio_clips = []
-    
-    # Process all dialogues
-    for i, dialogue in enumerate(dialogues):
-        for person, content in dialogue.items():
-            text = content["dialogue"]
-            print(f"\nProcessing {person} dialogue {i}: {text[:50]}...")
-            
-            name = host_name if person == "Host" else guest_name
-            voice = get_voice_for_person(person, name)
-            audio_file = os.path.join(output_folder, f"{person}_{i}.mp3")
-            
-            try:
-                audio_clip = await generate_dialogue_audio(text, voice, audio_file)
-                if audio_clip:
-                    audio_clips.append(audio_clip)
-            except Exception as e:
-                print(f"Error generating audio for dialogue: {str(e)}")
-                continue
-    
-    if not audio_clips:
-        print("No audio clips were generated successfully")
-        return None
+    # Generate random filename
+    random_filename = f"podcast_{uuid.uuid4().hex[:8]}.{audio_format.extension}"
+    final_file = os.path.join(output_folder, random_filename)
+    logger.info(f"Creating podcast {final_file} with host {host_name} and guest {guest_name}")
     
+    writer = None
+    mixing = AUDIO_MIXER == "pcm"
     try:
-        # Combine all audio clips
-        print(f"\nCombining {len(audio_clips)} audio clips...")
-        final_audio = sum(audio_clips)
+        # Clips are appended frame by frame as they arrive, in script order, or
+        # collected and mixed in one pass at the end
+        clip_count = 0
+        completed = 0
+        assembly_seconds = 0.0
+        turns = []
+        if mixing:
+            writer = PcmMixer(
+                final_file, PAUSE_MS, MIX_TARGET_DBFS, MIX_INTERJECTION_WORDS, MIX_OVERLAP_MS, MIX_DUCK_DB,
+                output=audio_format, ffmpeg=FFMPEG_BINARY,
+            )
+        elif audio_format.passthrough:
+            writer = Mp3Writer(final_file)
+        else:
+            # Frames are transcoded as they are appended, so the encoder runs once and streams
+            writer = Mp3Writer(final_file, FfmpegEncoder(final_file, audio_format, FFMPEG_BINARY))
+        with writer:
+            if on_output and not mixing:
+                on_output(final_file)
+            async for turn, audio in synthesize_in_order(iter_turns(dialogues, host_name, guest_name, output_folder), turns):
+                completed += 1
+                started = time.perf_counter()
+                if not audio:
+                    ok = False
+                elif mixing:
+                    ok = writer.write_clip(audio, turn["person"], turn["text"]) > 0
+                else:
+                    ok = writer.write_clip(audio, pause_ms=PAUSE_MS) > 0
+                assembly_seconds += time.perf_counter() - started
+                if audio and not ok:
+                    logger.warning(f"Generated audio clip is empty for {turn['person']} dialogue {turn['index']}")
+                if ok:
+                    clip_count += 1
+                else:
+                    TURNS_SKIPPED.inc()
+                if on_turn:
+                    on_turn(completed, len(turns), turn, ok)
+            export_started_at = time.time()
+            export_started = time.perf_counter()
+            if mixing and clip_count:
+                await asyncio.to_thread(writer.export)
+                if on_output:
+                    on_output(final_file)
+            elif clip_count:
+                # An encoder finishes the file on close, which waits for ffmpeg
+                await asyncio.to_thread(writer.close)
+        ASSEMBLY_SECONDS.observe(assembly_seconds)
         
-        # Generate random filename
-        random_filename = f"podcast_{uuid.uuid4().hex[:8]}.mp3"
-        final_file = os.path.join(output_folder, random_filename)
-        
-        print(f"Exporting to {final_file}")
-        final_audio.export(final_file, format="mp3")
-        
-        # Verify the final file
-        if not os.path.exists(final_file):
-            print("Final file was not created")
-            return None
-        
-        file_size = os.path.getsize(final_file)
-        print(f"Final file size: {file_size} bytes")
-        
-        if file_size == 0:
-            print("Final file is empty")
+        if clip_count == 0:
+            logger.warning("No audio clips were generated successfully")
+            writer.discard()
             return None
         
-        # Keep dialogue files for reference
-        print(f"Successfully created podcast at {final_file}")
-        
-        # Immediately clean up dialogue files
-        cleanup_dialogue_files(output_folder)
+        # Immediately clean up dialogue files (none are written in in-memory mode)
+        if not TTS_IN_MEMORY:
+            cleanup_dialogue_files(output_folder)
+        export_seconds = time.perf_counter() - export_started
+        EXPORT_SECONDS.observe(export_seconds)
+        tracer.record("export", export_started_at, export_seconds)
         
+        logger.info(
+            f"Combined {clip_count} audio clips into {final_file}: "
+            f"{os.path.getsize(final_file)} bytes ({writer.duration:.1f}s)"
+        )
         return final_file
         
     except Exception as e:
-        print(f"Error creating final podcast: {str(e)}")
+        logger.error(f"Error creating final podcast: {str(e)}")
+        if writer:
+            writer.discard()
         return None
@@ -0,0 +1,165 @@
+"""
+Output formats for finished podcasts, and the ffmpeg encoder that produces them.
+
+MP3 from edge-tts is written through untouched unless a bitrate, sample rate
+or channel count is asked for. Every other format is encoded once, by one
+ffmpeg process per podcast fed with the MP3 frames as they are assembled,
+into a container that can be streamed while it is still being written.
+"""
+import queue
+import subprocess
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+@dataclass(frozen=True)
+class Codec:
+    encoder: str
+    muxer_args: tuple
+    extension: str
+    media_type: str
+    sample_rates: tuple
+    bitrate: Optional[int]  # Default in kbps; None keeps the source MP3 as is
+    extra_args: tuple = ()
+
+MP3_SAMPLE_RATES = (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+# The defaults of each codec are mono speech presets
+CODECS = {
+    "mp3": Codec("libmp3lame", ("-f", "mp3"), "mp3", "audio/mpeg", MP3_SAMPLE_RATES, None),
+    "opus": Codec(
+        "libopus", ("-f", "ogg"), "opus", "audio/ogg", (8000, 12000, 16000, 24000, 48000), 32,
+        ("-application", "voip"),
+    ),
+    # Fragmented MP4, so the file plays while it grows
+    "aac": Codec(
+        "aac", ("-f", "mp4", "-movflags", "+empty_moov+default_base_moof", "-frag_duration", "1000000"),
+        "m4a", "audio/mp4", MP3_SAMPLE_RATES, 48,
+    ),
+}
+
+MEDIA_TYPES = {codec.extension: codec.media_type for codec in CODECS.values()}
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """A codec with its bitrate in kbps, sample rate and channel count; unset values use the codec's defaults"""
+
+    codec: str = "mp3"
+    bitrate: Optional[int] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+
+    @classmethod
+    def resolve(cls, codec: str = "mp3", bitrate: Optional[int] = None, sample_rate: Optional[int] = None, channels: Optional[int] = None) -> "AudioFormat":
+        """Validate requested output options; raises ValueError for unsupported ones"""
+        spec = CODECS.get(codec)
+        if spec is None:
+            raise ValueError(f"Unsupported audio format {codec!r}; use one of {', '.join(CODECS)}")
+        if bitrate is not None and not 8 <= bitrate <= 320:
+            raise ValueError("Audio bitrate must be between 8 and 320 kbps")
+        if sample_rate is not None and sample_rate not in spec.sample_rates:
+            raise ValueError(f"{codec} supports sample rates {', '.join(map(str, spec.sample_rates))}")
+        if channels is not None and channels not in (1, 2):
+            raise ValueError("Audio channels must be 1 or 2")
+        return cls(codec, bitrate, sample_rate, channels)
+
+    @property
+    def spec(self) -> Codec:
+        return CODECS[self.codec]
+
+    @property
+    def passthrough(self) -> bool:
+        """Whether source MP3 frames can be written out as they are"""
+        return self.codec == "mp3" and self.bitrate is None and self.sample_rate is None and self.channels is None
+
+    @property
+    def extension(self) -> str:
+        return self.spec.extension
+
+    @property
+    def key(self) -> str:
+        """Identifies the output in cache keys"""
+        return "mp3" if self.passthrough else f"{self.codec}-{self.bitrate}-{self.sample_rate}-{self.channels}"
+
+    def encode_args(self, source_bitrate: int = 48, source_sample_rate: int = 24000) -> List[str]:
+        """ffmpeg output options; unset values fall back to the codec default, then to the source's"""
+        spec = self.spec
+        return [
+            "-c:a", spec.encoder,
+            "-b:a", f"{self.bitrate or spec.bitrate or source_bitrate}k",
+            "-ar", str(self.sample_rate or source_sample_rate),
+            "-ac", str(self.channels or 1),
+            *spec.extra_args,
+            *spec.muxer_args,
+        ]
+
+def media_type_for(path: str) -> str:
+    return MEDIA_TYPES.get(path.rsplit(".", 1)[-1].lower(), "application/octet-stream")
+
+class FfmpegEncoder:
+    """
+    File-like sink that transcodes the MP3 written to it into path.
+
+    Writes are buffered until flush, then handed to a feeder thread, so a
+    busy encoder never blocks the caller. close waits for ffmpeg to finish
+    the file and should run off the event loop.
+    """
+
+    def __init__(self, path: str, audio_format: AudioFormat, ffmpeg: str = "ffmpeg"):
+        self.path = path
+        self.written = 0
+        self.closed = False
+        self._buffer = bytearray()
+        # Create the file up front so readers can open it before ffmpeg's first write
+        open(path, "wb").close()
+        self._process = subprocess.Popen(
+            [ffmpeg, "-v", "error", "-f", "mp3", "-i", "pipe:0", *audio_format.encode_args(), "-y", path],
+            stdin=subprocess.PIPE,
+            bufsize=0,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        self._queue = queue.Queue()
+        self._feeder = threading.Thread(target=self._feed, daemon=True)
+        self._feeder.start()
+
+    def _feed(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            try:
+                self._process.stdin.write(data)
+            except (BrokenPipeError, ValueError):
+                # ffmpeg exited early; close reports its error
+                return
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self.written += len(data)
+        return len(data)
+
+    def flush(self):
+        if self._buffer:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def tell(self) -> int:
+        return self.written
+
+    def close(self):
+        """Finish encoding; raises RuntimeError if ffmpeg failed"""
+        if self.closed:
+            return
+        self.closed = True
+        self.flush()
+        self._queue.put(None)
+        self._feeder.join()
+        if self.written == 0:
+            # Nothing to encode; ffmpeg would only complain about missing input
+            self._process.kill()
+            self._process.communicate()
+            return
+        _, stderr = self._process.communicate()
+        if self._process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
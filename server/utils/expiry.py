@@ -0,0 +1,159 @@
+import asyncio
+import os
+import shutil
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Optional
+import logging
+
+from utils.store import SharedStore
+
+logger = logging.getLogger(__name__)
+
+def path_size(path: str) -> int:
+    """Size in bytes of a file, or of the files directly inside a folder"""
+    try:
+        if os.path.isdir(path):
+            return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def remove_path(path: str) -> None:
+    """Delete a file or folder, ignoring anything that is already gone"""
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        logger.info(f"Removed expired artifact: {path}")
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove {path}: {e}")
+
+class ExpiryIndex:
+    """
+    Single source of truth for when uploads and generated podcasts are deleted.
+
+    Artifacts are registered in the shared store when they are created, so
+    nothing has to rescan the directories. An artifact is evicted once its
+    deadline passes, or earlier (soonest deadline first) while the tracked
+    total exceeds max_bytes. Pinned artifacts are never evicted, so jobs and
+    streams in any worker can hold on to what they are using. Only the
+    worker holding the sweeper lease calls collect().
+
+    Every method but wait talks to the store and blocks, so async code calls
+    them through asyncio.to_thread; they may run in any thread.
+    """
+
+    def __init__(self, store: SharedStore, max_bytes: int):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self.quota_evictions = 0
+        self._wakeup = None
+        self._loop = None
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normpath(path)
+
+    def adopt(self, directory: str, ttl_seconds: float) -> int:
+        """
+        Track items in directory that the index does not know about, e.g. left over from a crash.
+
+        Only meant to run once, by the first leader; returns the number of adopted items.
+        """
+        adopted = 0
+        try:
+            items = [entry.path for entry in os.scandir(directory) if not entry.name.startswith(".")]
+        except FileNotFoundError:
+            return 0
+        for path in items:
+            if not self.store.has_artifact(self._key(path)):
+                self.track(path, ttl_seconds)
+                adopted += 1
+        return adopted
+
+    def track(self, path: str, ttl_seconds: float, pinned: bool = False) -> float:
+        """Register an artifact that expires ttl_seconds from now; returns the deadline as a timestamp"""
+        key = self._key(path)
+        deadline = time.time() + ttl_seconds
+        self.store.put_artifact(key, path_size(key), deadline)
+        if pinned:
+            self.store.pin_artifact(key, 1)
+        self._wake()
+        return deadline
+
+    def extend(self, path: str, ttl_seconds: float) -> float:
+        """Reset an artifact's deadline to ttl_seconds from now and refresh its size"""
+        return self.track(path, ttl_seconds)
+
+    def deadline(self, path: str) -> Optional[float]:
+        return self.store.artifact_deadline(self._key(path))
+
+    def pin(self, path: str) -> None:
+        self.store.pin_artifact(self._key(path), 1)
+
+    def unpin(self, path: str) -> None:
+        self.store.pin_artifact(self._key(path), -1)
+        self._wake()
+
+    @contextmanager
+    def lease(self, path: str):
+        """Keep path from being evicted for the duration of the block"""
+        self.pin(path)
+        try:
+            yield
+        finally:
+            self.unpin(path)
+
+    @asynccontextmanager
+    async def async_lease(self, path: str):
+        """Same as lease, for async code"""
+        await asyncio.to_thread(self.pin, path)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self.unpin, path)
+
+    def _wake(self):
+        if self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def collect(self, now: Optional[float] = None) -> List[str]:
+        """Stop tracking and return every artifact that is due for deletion"""
+        expired, evicted, total = self.store.take_expired_artifacts(now or time.time(), self.max_bytes)
+        self.evictions += len(expired)
+        self.quota_evictions += len(evicted)
+        if total > self.max_bytes:
+            logger.warning(f"Disk quota exceeded ({total} bytes) by artifacts still in use")
+        return expired + evicted
+
+    async def wait(self, max_seconds: float, until_deadline: bool = True) -> None:
+        """
+        Sleep until a change made by this worker or max_seconds, whichever comes first.
+
+        With until_deadline, also wake up when the next artifact is due.
+        """
+        if self._wakeup is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+        self._wakeup.clear()
+        next_deadline = await asyncio.to_thread(self.store.next_artifact_deadline) if until_deadline else None
+        timeout = max_seconds
+        if next_deadline is not None:
+            timeout = min(timeout, max(0.0, next_deadline - time.time()))
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            **self.store.artifact_stats(),
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "quota_evictions": self.quota_evictions,
+        }
@@ -0,0 +1,115 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+# Query parameters that only track where a click came from and never change the page
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref_src"}
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so trivially different spellings of the same page share a cache key"""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower() or "http"
+    host = (parsed.hostname or "").lower()
+    port = parsed.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    path = parsed.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunparse((scheme, host, path, "", query, ""))
+
+class CacheEntry:
+    """Extracted text plus the validators needed to revalidate it"""
+
+    __slots__ = ("text", "expires_at", "etag", "last_modified", "size")
+
+    def __init__(self, text: str, expires_at: float, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.text = text
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = len(text.encode("utf-8"))
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def revalidatable(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+class ExtractionCache:
+    """
+    In-memory LRU cache of extracted source text with a TTL and a size bound.
+
+    Keys are prefixed by source kind, e.g. "web:<canonical url>",
+    "youtube:<video id>" or "pdf:<sha256>". Expired entries that carry an
+    ETag or Last-Modified are kept so the next fetch can be conditional;
+    other expired entries are dropped on lookup.
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for key, fresh or revalidatable, counting a hit only if it is fresh"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if not entry.fresh and not entry.revalidatable:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if entry.fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    def put(self, key: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        entry = CacheEntry(text, time.time() + self.ttl_seconds, etag, last_modified)
+        if entry.size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = entry
+        self._total_bytes += entry.size
+        while self._total_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    def revalidated(self, key: str) -> Optional[str]:
+        """Extend the lifetime of an entry the origin confirmed unchanged (HTTP 304)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry.expires_at = time.time() + self.ttl_seconds
+        self.revalidations += 1
+        return entry.text
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+        }
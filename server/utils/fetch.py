@@ -0,0 +1,105 @@
+import asyncio
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+class FetchError(Exception):
+    """Raised when a page cannot be fetched within the configured limits"""
+
+class FetchResult:
+    """Status, headers and decoded body of a fetched page"""
+
+    __slots__ = ("url", "status_code", "headers", "text")
+
+    def __init__(self, url: str, status_code: int, headers: "httpx.Headers", text: str):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+
+class HttpFetcher:
+    """
+    Shared, pooled async HTTP client for ingesting web pages.
+
+    Bodies are read as a stream and abandoned as soon as they exceed
+    max_bytes; each request is also bounded by a total deadline, so a
+    slow-dripping server cannot hold a worker indefinitely.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float,
+        read_timeout: float,
+        total_timeout: float,
+        max_bytes: int,
+        max_redirects: int,
+        max_connections: int,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.max_bytes = max_bytes
+        self.max_redirects = max_redirects
+        self.max_connections = max_connections
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        # Created lazily so the connection pool belongs to the running event loop
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                follow_redirects=True,
+                max_redirects=self.max_redirects,
+                headers={"User-Agent": "Mozilla/5.0 (compatible; AximosBot/1.0)"},
+            )
+        return self._client
+
+    async def fetch_text(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """GET url and return its decoded body; 304 responses come back with an empty body"""
+        import httpx
+        try:
+            return await asyncio.wait_for(self._fetch(url, headers or {}), timeout=self.total_timeout)
+        except asyncio.TimeoutError:
+            raise FetchError(f"Timed out after {self.total_timeout:g}s fetching {url}")
+        except httpx.TooManyRedirects:
+            raise FetchError(f"Too many redirects (more than {self.max_redirects}) fetching {url}")
+        except httpx.TimeoutException as e:
+            raise FetchError(f"Timed out fetching {url}: {e.__class__.__name__}")
+        except httpx.HTTPError as e:
+            raise FetchError(f"Error fetching {url}: {e}")
+
+    async def _fetch(self, url: str, headers: Dict[str, str]) -> FetchResult:
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                return FetchResult(str(response.url), 304, response.headers, "")
+            response.raise_for_status()
+
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                raise FetchError(f"Response too large ({declared} bytes, limit {self.max_bytes})")
+
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body.extend(chunk)
+                if len(body) > self.max_bytes:
+                    raise FetchError(f"Response exceeded {self.max_bytes} bytes")
+
+            encoding = response.charset_encoding or "utf-8"
+            try:
+                text = body.decode(encoding, errors="replace")
+            except LookupError:
+                text = body.decode("utf-8", errors="replace")
+            return FetchResult(str(response.url), response.status_code, response.headers, text)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,250 @@
+"""
+PCM mixing engine for dialogue clips.
+
+All clips of a podcast are decoded in one ffmpeg call, placed on a single
+NumPy timeline with gaps that follow the conversation, mixed with short
+interjections overlapping the previous turn (which is ducked under them),
+level-matched per speaker and encoded once. Needs numpy and ffmpeg.
+"""
+import os
+import subprocess
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from utils.encoding import AudioFormat
+from utils.mp3 import iter_frames, strip_tags
+
+# Samples an MP3 decoder outputs before the first encoded sample; ffmpeg keeps
+# them when decoding a bare frame stream, so clip boundaries shift by this much
+DECODER_DELAY = 529
+
+BLOCK_MS = 50  # Block size for loudness measurement
+GATE_DBFS = -50.0  # Blocks quieter than this are treated as silence when measuring loudness
+MAX_GAIN_DB = 12.0  # Largest boost or cut applied to match a speaker's level
+CEILING = 10 ** (-1 / 20)  # Peaks above -1 dBFS are soft-limited
+RAMP_MS = 5  # Fade at clip edges, so cuts between frames never click
+DUCK_RAMP_MS = 40  # Fade into and out of ducking
+
+@dataclass
+class Clip:
+    speaker: str
+    text: str
+    frames: bytes
+    samples: int  # At the clip's own sample rate
+
+    @property
+    def words(self) -> int:
+        return len(self.text.split())
+
+def db_to_gain(db: float) -> float:
+    return 10 ** (db / 20)
+
+def block_power(samples: np.ndarray, block: int) -> np.ndarray:
+    """Mean square of each whole block of samples"""
+    usable = len(samples) - len(samples) % block
+    blocks = samples[:usable].reshape(-1, block)
+    return np.einsum("ij,ij->i", blocks, blocks, dtype=np.float64) / block
+
+def gated_rms(power: np.ndarray) -> Optional[float]:
+    """RMS over the blocks louder than GATE_DBFS; None if there are none"""
+    loud = power[power > db_to_gain(GATE_DBFS) ** 2]
+    return float(np.sqrt(loud.mean())) if len(loud) else None
+
+def soft_limit(samples: np.ndarray, ceiling: float = CEILING) -> np.ndarray:
+    """Compress peaks above ceiling smoothly instead of clipping them"""
+    over = np.abs(samples) > ceiling
+    if over.any():
+        headroom = 1.0 - ceiling
+        excess = np.abs(samples[over]) - ceiling
+        samples[over] = np.sign(samples[over]) * (ceiling + headroom * np.tanh(excess / headroom))
+    return samples
+
+def run_ffmpeg(ffmpeg: str, args: List[str], data: bytes) -> bytes:
+    result = subprocess.run([ffmpeg, "-v", "error", *args], input=data, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+class PcmMixer:
+    """
+    Collect MP3 clips during synthesis and mix them into one podcast on export.
+
+    write_clip only keeps the clip's frames; decoding, mixing and encoding
+    all happen in export, which blocks and should run off the event loop.
+    Gaps scale pause_ms by how the previous turn ended. A turn of at most
+    interjection_words words answering another speaker starts overlap_ms
+    before that speaker finishes, and the speaker is lowered by duck_db
+    while they overlap. Each speaker's level is matched to target_dbfs.
+    The mix is encoded as output, or as MP3 matching the clips by default.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        pause_ms: int,
+        target_dbfs: float = -20.0,
+        interjection_words: int = 3,
+        overlap_ms: int = 300,
+        duck_db: float = 8.0,
+        output: Optional[AudioFormat] = None,
+        ffmpeg: str = "ffmpeg",
+    ):
+        self.path = path
+        self.pause_ms = pause_ms
+        self.target_dbfs = target_dbfs
+        self.interjection_words = interjection_words
+        self.overlap_ms = overlap_ms
+        self.duck_db = duck_db
+        self.output = output or AudioFormat()
+        self.ffmpeg = ffmpeg
+        self.clips: List[Clip] = []
+        self.sample_rate = None
+        self.bitrate = None  # Of the clips, in bits per second
+        self.duration = 0.0  # Estimated while collecting, exact after export
+
+    def write_clip(self, data: bytes, speaker: str, text: str) -> float:
+        """Queue a clip for mixing; returns its duration in seconds"""
+        data = strip_tags(data)
+        frames = []
+        samples = 0
+        header = None
+        for offset, header in iter_frames(data):
+            frames.append(data[offset:offset + header.frame_length])
+            samples += header.samples_per_frame
+        if header is None:
+            return 0.0
+        if self.sample_rate is None:
+            self.sample_rate = header.sample_rate
+            self.bitrate = header.bitrate
+        elif header.sample_rate != self.sample_rate:
+            raise ValueError(f"Clip sample rate {header.sample_rate} does not match {self.sample_rate}")
+        self.clips.append(Clip(speaker, text, b"".join(frames), samples))
+        duration = samples / header.sample_rate
+        self.duration += duration + self.pause_ms / 1000
+        return duration
+
+    def _gap_ms(self, previous: Clip, current: Clip) -> float:
+        """Pause before current, shaped by how previous ended"""
+        text = previous.text.rstrip()
+        if previous.speaker == current.speaker:
+            return self.pause_ms * 0.5
+        if text.endswith(("...", "…", "-", "—")):
+            return self.pause_ms * 0.3  # Trailing off or cut off: the answer comes straight in
+        if text.endswith("?"):
+            return self.pause_ms * 0.6
+        if previous.words >= 40:
+            return self.pause_ms * 1.3  # A breath after a long explanation
+        return self.pause_ms
+
+    def _decode(self) -> np.ndarray:
+        """Decode every clip in a single ffmpeg call, as float32 samples"""
+        raw = run_ffmpeg(
+            self.ffmpeg,
+            ["-f", "mp3", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(self.sample_rate), "pipe:1"],
+            b"".join(clip.frames for clip in self.clips),
+        )
+        return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+
+    def _layout(self) -> List[tuple]:
+        """Timeline start of each clip and whether it is an overlapping interjection"""
+        overlap = int(self.overlap_ms * self.sample_rate / 1000)
+        layout = []
+        main = None  # Index of the last clip that was not an interjection
+        end = 0  # End of everything placed so far
+        for i, clip in enumerate(self.clips):
+            previous = self.clips[i - 1] if i else None
+            if (
+                main is not None and main == i - 1 and clip.speaker != previous.speaker
+                and clip.words <= self.interjection_words
+            ):
+                main_start, _ = layout[main]
+                start = max(main_start, main_start + previous.samples - overlap)
+                layout.append((start, True))
+            else:
+                gap = int(self._gap_ms(previous, clip) * self.sample_rate / 1000) if previous else 0
+                start = end + gap
+                layout.append((start, False))
+                main = i
+            end = max(end, start + clip.samples)
+        return layout
+
+    def render(self) -> np.ndarray:
+        """Mix all clips into one float32 timeline"""
+        pcm = self._decode()
+        bounds = np.cumsum([0] + [clip.samples for clip in self.clips]) + DECODER_DELAY
+        bounds = np.minimum(bounds, len(pcm))
+        sources = [pcm[bounds[i]:bounds[i + 1]] for i in range(len(self.clips))]
+
+        # One gain per speaker, measured across all of their clips
+        block = max(1, self.sample_rate * BLOCK_MS // 1000)
+        gains = {}
+        for speaker in {clip.speaker for clip in self.clips}:
+            rms = gated_rms(np.concatenate([
+                block_power(source, block) for source, clip in zip(sources, self.clips) if clip.speaker == speaker
+            ]))
+            gain_db = self.target_dbfs - 20 * np.log10(rms) if rms else 0.0
+            gains[speaker] = db_to_gain(float(np.clip(gain_db, -MAX_GAIN_DB, MAX_GAIN_DB)))
+
+        layout = self._layout()
+        length = max(start + len(source) for (start, _), source in zip(layout, sources))
+        out = np.zeros(length + self.pause_ms * self.sample_rate // 1000, dtype=np.float32)
+        ramp = np.linspace(0.0, 1.0, max(1, self.sample_rate * RAMP_MS // 1000), dtype=np.float32)
+        duck_ramp = np.linspace(1.0, db_to_gain(-self.duck_db), max(1, self.sample_rate * DUCK_RAMP_MS // 1000), dtype=np.float32)
+
+        # Main turns first, so interjections can duck whatever they land on
+        order = sorted(range(len(sources)), key=lambda i: layout[i][1])
+        for i in order:
+            (start, interjection), source = layout[i], sources[i]
+            clip = source * gains[self.clips[i].speaker]
+            edge = min(len(ramp), len(clip) // 2)
+            if edge:
+                clip[:edge] *= ramp[:edge]
+                clip[len(clip) - edge:] *= ramp[:edge][::-1]
+            end = start + len(clip)
+            if interjection:
+                envelope = np.full(len(clip), duck_ramp[-1], dtype=np.float32)
+                edge = min(len(duck_ramp), len(clip) // 2)
+                envelope[:edge] = duck_ramp[:edge]
+                envelope[len(envelope) - edge:] = duck_ramp[:edge][::-1]
+                out[start:end] *= envelope
+            out[start:end] += clip
+        return soft_limit(out)
+
+    def export(self) -> float:
+        """Mix and encode the podcast to path; returns its duration in seconds"""
+        if not self.clips:
+            raise ValueError("No clips to export")
+        out = self.render()
+        duration = len(out) / self.sample_rate
+        out *= 32767
+        encoded = run_ffmpeg(
+            self.ffmpeg,
+            [
+                "-f", "s16le", "-ar", str(self.sample_rate), "-ac", "1", "-i", "pipe:0",
+                *self.output.encode_args(self.bitrate // 1000, self.sample_rate), "pipe:1",
+            ],
+            out.astype(np.int16).tobytes(),
+        )
+        with open(self.path, "wb") as f:
+            f.write(encoded)
+        self.duration = duration
+        return duration
+
+    def close(self):
+        self.clips = []
+
+    def discard(self):
+        """Drop the clips and remove the output file, if it was written"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,202 @@
+import os
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bitrate tables in kbps, indexed by (version group, layer) then by the 4-bit bitrate index
+BITRATES = {
+    ("1", 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    ("1", 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    ("1", 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    ("2", 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    ("2", 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    ("2", 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates in Hz, indexed by version then by the 2-bit sample rate index
+SAMPLE_RATES = {
+    "1": [44100, 48000, 32000],
+    "2": [22050, 24000, 16000],
+    "2.5": [11025, 12000, 8000],
+}
+
+VERSIONS = {0b00: "2.5", 0b10: "2", 0b11: "1"}
+LAYERS = {0b01: 3, 0b10: 2, 0b11: 1}
+
+class FrameHeader:
+    """Decoded fields of a 4-byte MPEG audio frame header"""
+
+    __slots__ = ("raw", "version", "layer", "bitrate", "sample_rate", "padding", "channels")
+
+    def __init__(self, raw: bytes, version: str, layer: int, bitrate: int, sample_rate: int, padding: int, channels: int):
+        self.raw = raw
+        self.version = version
+        self.layer = layer
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.padding = padding
+        self.channels = channels
+
+    @property
+    def frame_length(self) -> int:
+        """Length of the whole frame in bytes, header included"""
+        if self.layer == 1:
+            return (12 * self.bitrate // self.sample_rate + self.padding) * 4
+        if self.layer == 3 and self.version != "1":
+            return 72 * self.bitrate // self.sample_rate + self.padding
+        return 144 * self.bitrate // self.sample_rate + self.padding
+
+    @property
+    def samples_per_frame(self) -> int:
+        if self.layer == 1:
+            return 384
+        if self.layer == 3 and self.version != "1":
+            return 576
+        return 1152
+
+    @property
+    def duration(self) -> float:
+        """Playback duration of one frame in seconds"""
+        return self.samples_per_frame / self.sample_rate
+
+def parse_header(data: bytes, offset: int = 0) -> Optional[FrameHeader]:
+    """Parse a frame header at offset, returning None if it is not a valid one"""
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset:offset + 4]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = VERSIONS.get((b1 >> 3) & 0b11)
+    layer = LAYERS.get((b1 >> 1) & 0b11)
+    bitrate_index = (b2 >> 4) & 0b1111
+    sample_rate_index = (b2 >> 2) & 0b11
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    version_group = "1" if version == "1" else "2"
+    return FrameHeader(
+        raw=bytes(data[offset:offset + 4]),
+        version=version,
+        layer=layer,
+        bitrate=BITRATES[(version_group, layer)][bitrate_index] * 1000,
+        sample_rate=SAMPLE_RATES[version][sample_rate_index],
+        padding=(b2 >> 1) & 0b1,
+        channels=1 if (b3 >> 6) == 0b11 else 2,
+    )
+
+def strip_tags(data: bytes) -> bytes:
+    """Drop a leading ID3v2 tag and a trailing ID3v1 tag, leaving only audio frames"""
+    start, end = 0, len(data)
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        start = 10 + size + footer
+    if end - start >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    return data[start:end]
+
+def is_info_frame(data: bytes, offset: int, header: FrameHeader) -> bool:
+    """Whether the frame is a Xing/Info/VBRI metadata frame rather than audio"""
+    frame = data[offset:offset + header.frame_length]
+    return b"Xing" in frame or b"Info" in frame or b"VBRI" in frame
+
+def iter_frames(data: bytes) -> Iterator[Tuple[int, FrameHeader]]:
+    """Yield (offset, header) for every audio frame, resynchronizing past junk"""
+    offset = 0
+    first = True
+    while offset + 4 <= len(data):
+        header = parse_header(data, offset)
+        if header is None or offset + header.frame_length > len(data):
+            # Lost sync; scan forward for the next frame sync byte
+            offset = data.find(b"\xff", offset + 1)
+            if offset == -1:
+                return
+            continue
+        if not (first and is_info_frame(data, offset, header)):
+            yield offset, header
+        first = False
+        offset += header.frame_length
+
+@lru_cache(maxsize=32)
+def silence_frames(header_raw: bytes, duration_ms: int) -> bytes:
+    """
+    Build a block of silent frames matching the given frame header.
+
+    A frame whose side info and main data are all zero decodes to silence,
+    so only the header has to agree with the surrounding audio. Padding and
+    CRC protection are cleared so every silent frame has the same length.
+    """
+    b0, b1, b2, b3 = header_raw
+    raw = bytes([b0, b1 | 0x01, b2 & ~0x02 & 0xFF, b3])
+    header = parse_header(raw)
+    count = max(0, round(duration_ms / 1000 / header.duration))
+    frame = raw + bytes(header.frame_length - 4)
+    return frame * count
+
+class Mp3Writer:
+    """
+    Append MP3 clips and pauses to a file at the frame level, without decoding or re-encoding.
+
+    Frames go to file instead, if given: any binary file-like object that
+    writes path, such as an encoder.
+    """
+
+    def __init__(self, path: str, file=None):
+        self.path = path
+        self.frames = 0
+        self.duration = 0.0
+        self._file = file if file is not None else open(path, "wb")
+
+    def write_clip(self, data: bytes, pause_ms: int = 0) -> float:
+        """Write a clip's audio frames followed by pause_ms of silence; returns seconds written"""
+        data = strip_tags(data)
+        written = 0.0
+        last_header = None
+        view = memoryview(data)
+        for offset, header in iter_frames(data):
+            self._file.write(view[offset:offset + header.frame_length])
+            written += header.duration
+            last_header = header
+            self.frames += 1
+
+        if last_header is None:
+            return 0.0
+
+        if pause_ms > 0:
+            silence = silence_frames(last_header.raw, pause_ms)
+            self._file.write(silence)
+            frame_count = len(silence) // parse_header(silence).frame_length if silence else 0
+            written += frame_count * last_header.duration
+            self.frames += frame_count
+
+        self._file.flush()
+        self.duration += written
+        return written
+
+    @property
+    def size(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def discard(self):
+        """Close and remove the output file"""
+        try:
+            self.close()
+        except Exception as e:
+            logger.warning(f"Could not close {self.path}: {e}")
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            logger.warning(f"Could not remove {self.path}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,36 @@
+"""
+CPU-bound parsing helpers.
+
+These run in worker processes, so they must stay importable without the
+FastAPI app and take and return only picklable values. The parsers are imported on first use.
+"""
+
+def html_to_text(html: str) -> str:
+    """Extract the visible text of an HTML page"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+    return soup.get_text()
+
+def pdf_page_count(file_path: str) -> int:
+    """Number of pages in a PDF file"""
+    import PyPDF2
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+def pdf_pages_to_text(file_path: str, start: int, end: int) -> str:
+    """Extract the text of pages [start, end) of a PDF file"""
+    import PyPDF2
+    with open(file_path, 'rb') as file:
+        # Create a PDF reader object
+        pdf_reader = PyPDF2.PdfReader(file)
+        
+        # Extract text from the requested pages
+        text = []
+        for page in pdf_reader.pages[start:end]:
+            text.append(page.extract_text())
+        
+        # Join all text with newlines
+        return '\n'.join(text)
@@ -0,0 +1,57 @@
+import asyncio
+import hashlib
+import os
+from typing import AsyncIterator, Optional, Tuple
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header asks only for bytes beyond the end of the file"""
+
+def make_etag(stat: os.stat_result) -> str:
+    """Strong ETag for a file that is never modified after it is finished"""
+    identity = f"{stat.st_ino}-{stat.st_size}-{stat.st_mtime_ns}"
+    return '"' + hashlib.sha1(identity.encode("ascii")).hexdigest()[:20] + '"'
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range "bytes=" header into inclusive (start, end) offsets.
+
+    Returns None when the whole file should be sent: no header, an unknown
+    unit, a malformed value or several ranges, which servers may ignore.
+    Raises RangeNotSatisfiable when the range starts past the end of the file.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        elif last:
+            # Suffix range: the final N bytes
+            start = max(0, size - int(last))
+            end = size - 1
+        else:
+            return None
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+async def iter_file_range(file, start: int, end: int, chunk_size: int) -> AsyncIterator[bytes]:
+    """Yield bytes start..end (inclusive) of an open binary file, reading off the event loop"""
+    await asyncio.to_thread(file.seek, start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = await asyncio.to_thread(file.read, min(chunk_size, remaining))
+        if not chunk:
+            return
+        remaining -= len(chunk)
+        yield chunk
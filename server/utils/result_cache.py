@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+def make_result_key(content: str, host_name: str, guest_name: str, length: str, audio_format: str = "mp3") -> str:
+    """Key identical generation requests by content hash and voice, length and output format settings"""
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return f"{content_hash}:{host_name}:{guest_name}:{length}:{audio_format}"
+
+class ResultCache:
+    """
+    Memoize finished generations and coalesce identical in-flight ones.
+
+    Each entry remembers the podcast file it points to and expires before
+    that file's scheduled cleanup, so a returned audio URL always has at
+    least grace_seconds left to be fetched. Entries are also dropped as
+    soon as their podcast folder is cleaned up.
+    """
+
+    def __init__(self, max_entries: int, grace_seconds: float):
+        self.max_entries = max_entries
+        self.grace_seconds = grace_seconds
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], str, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Entries may be invalidated from threads other than the event loop's
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            result, podcast_file, expires_at = entry
+            if time.time() >= expires_at or not os.path.exists(podcast_file):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: Dict[str, Any], podcast_file: str, deleted_at: float) -> None:
+        """Cache a result whose podcast file is scheduled for deletion at deleted_at"""
+        expires_at = deleted_at - self.grace_seconds
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = (result, podcast_file, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_folder(self, folder: str) -> None:
+        """Forget every entry whose podcast file lives under folder"""
+        folder = os.path.abspath(folder)
+        with self._lock:
+            stale = [
+                key for key, (_, podcast_file, _) in self._entries.items()
+                if os.path.abspath(podcast_file).startswith(folder + os.sep)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    async def get_or_create(
+        self,
+        key: str,
+        create: Callable[[], Awaitable[Tuple[Dict[str, Any], str, float]]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Return (result, reused) for key, running create() only if no cached or in-flight result exists.
+
+        create() must return (result, podcast_file, deleted_at). Failures are
+        shared with coalesced waiters but never cached.
+        """
+        result = self.get(key)
+        if result is not None:
+            self.hits += 1
+            return result, True
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future), True
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result, podcast_file, deleted_at = await create()
+            self.put(key, result, podcast_file, deleted_at)
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting; mark the exception as retrieved to avoid warnings
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,294 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    heartbeat REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    deadline REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_deadline ON artifacts (deadline);
+CREATE TABLE IF NOT EXISTS artifact_pins (
+    path TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (path, owner)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    status TEXT NOT NULL,
+    audio_path TEXT,
+    snapshot TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    items TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+# Pins of a worker that has not sent a heartbeat for this many heartbeat intervals are ignored
+STALE_HEARTBEATS = 3
+
+def make_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+class SharedStore:
+    """
+    SQLite database (WAL mode) shared by every worker process on a host.
+
+    It holds artifact expiry records and pins, job snapshots and events,
+    worker heartbeats and named leases used for leader election. Each
+    thread gets its own connection; all statements run in autocommit mode
+    except multi-statement updates, which take the write lock up front.
+    """
+
+    def __init__(self, path: str, heartbeat_interval: float):
+        self.path = path
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_id = make_worker_id()
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @property
+    def stale_before(self) -> float:
+        return time.time() - self.heartbeat_interval * STALE_HEARTBEATS
+
+    # Workers and leader election
+
+    def heartbeat(self) -> None:
+        self.connection.execute(
+            "INSERT INTO workers (id, heartbeat) VALUES (?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET heartbeat = excluded.heartbeat",
+            (self.worker_id, time.time())
+        )
+
+    def acquire_lease(self, name: str, ttl_seconds: float) -> bool:
+        """Take or renew the named lease; returns whether this worker holds it"""
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+                (name, self.worker_id, now + ttl_seconds, now)
+            )
+            row = conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row["owner"] == self.worker_id
+
+    def release_lease(self, name: str) -> None:
+        self.connection.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.worker_id))
+
+    def leave(self) -> None:
+        """Drop this worker's heartbeat, pins and leases on shutdown"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM artifact_pins WHERE owner = ?", (self.worker_id,))
+            conn.execute("DELETE FROM leases WHERE owner = ?", (self.worker_id,))
+            conn.execute("DELETE FROM workers WHERE id = ?", (self.worker_id,))
+
+    def reap_workers(self) -> List[str]:
+        """Forget workers that stopped sending heartbeats, along with their pins; returns their ids"""
+        stale_before = self.stale_before
+        with self.transaction() as conn:
+            dead = [row["id"] for row in conn.execute("SELECT id FROM workers WHERE heartbeat < ?", (stale_before,))]
+            for worker_id in dead:
+                conn.execute("DELETE FROM artifact_pins WHERE owner = ?", (worker_id,))
+                conn.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+        return dead
+
+    # Artifacts
+
+    def put_artifact(self, path: str, size: int, deadline: float) -> None:
+        self.connection.execute(
+            "INSERT INTO artifacts (path, size, deadline, created_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (path) DO UPDATE SET size = excluded.size, deadline = excluded.deadline",
+            (path, size, deadline, time.time())
+        )
+
+    def has_artifact(self, path: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM artifacts WHERE path = ?", (path,)).fetchone() is not None
+
+    def artifact_deadline(self, path: str) -> Optional[float]:
+        row = self.connection.execute("SELECT deadline FROM artifacts WHERE path = ?", (path,)).fetchone()
+        return row["deadline"] if row is not None else None
+
+    def pin_artifact(self, path: str, delta: int) -> None:
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO artifact_pins (path, owner, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (path, owner) DO UPDATE SET count = count + excluded.count",
+                (path, self.worker_id, delta)
+            )
+            conn.execute("DELETE FROM artifact_pins WHERE count <= 0")
+
+    def next_artifact_deadline(self) -> Optional[float]:
+        row = self.connection.execute(
+            "SELECT MIN(deadline) AS deadline FROM artifacts "
+            "WHERE path NOT IN (SELECT path FROM artifact_pins)"
+        ).fetchone()
+        return row["deadline"]
+
+    def take_expired_artifacts(self, now: float, max_bytes: int) -> Tuple[List[str], List[str], int]:
+        """
+        Remove and return unpinned artifacts past their deadline, then the
+        soonest-to-expire ones while the total size is over max_bytes.
+
+        Returns (expired paths, paths evicted for space, bytes still tracked).
+        """
+        with self.transaction() as conn:
+            unpinned = "path NOT IN (SELECT path FROM artifact_pins)"
+            expired = [
+                row["path"] for row in
+                conn.execute(f"SELECT path FROM artifacts WHERE deadline <= ? AND {unpinned}", (now,))
+            ]
+            conn.executemany("DELETE FROM artifacts WHERE path = ?", ((path,) for path in expired))
+
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) AS total FROM artifacts").fetchone()["total"]
+            evicted = []
+            if total > max_bytes:
+                for row in conn.execute(f"SELECT path, size FROM artifacts WHERE {unpinned} ORDER BY deadline").fetchall():
+                    if total <= max_bytes:
+                        break
+                    evicted.append(row["path"])
+                    total -= row["size"]
+                conn.executemany("DELETE FROM artifacts WHERE path = ?", ((path,) for path in evicted))
+        return expired, evicted, total
+
+    def artifact_stats(self) -> Dict[str, Any]:
+        conn = self.connection
+        row = conn.execute("SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes FROM artifacts").fetchone()
+        pinned = conn.execute("SELECT COUNT(DISTINCT path) AS pinned FROM artifact_pins").fetchone()
+        return {"entries": row["entries"], "pinned": pinned["pinned"], "bytes": row["bytes"]}
+
+    # Jobs
+
+    def save_job(self, job_id: str, status: str, audio_path: Optional[str], snapshot: str,
+                 finished_at: Optional[float], events: Sequence[Dict[str, Any]] = ()) -> None:
+        """Store a job's latest snapshot (as JSON), together with the events that led to it"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, owner, status, audio_path, snapshot, updated_at, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET status = excluded.status, audio_path = excluded.audio_path, "
+                "snapshot = excluded.snapshot, updated_at = excluded.updated_at, finished_at = excluded.finished_at",
+                (job_id, self.worker_id, status, audio_path, snapshot, time.time(), finished_at)
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO job_events (job_id, seq, event, data) VALUES (?, ?, ?, ?)",
+                ((job_id, event["id"], event["event"], json.dumps(event["data"])) for event in events)
+            )
+
+    def load_job(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self.connection.execute(
+            "SELECT status, audio_path, snapshot, finished_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+
+    def job_events(self, job_id: str, after: int) -> List[Dict[str, Any]]:
+        return [
+            {"id": row["seq"], "event": row["event"], "data": json.loads(row["data"])}
+            for row in self.connection.execute(
+                "SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after)
+            )
+        ]
+
+    def fail_orphaned_jobs(self) -> int:
+        """Mark unfinished jobs whose worker is gone as failed; returns how many there were"""
+        now = time.time()
+        with self.transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, snapshot FROM jobs WHERE status IN ('queued', 'running') "
+                "AND owner NOT IN (SELECT id FROM workers)"
+            ).fetchall()
+            for row in rows:
+                snapshot = json.loads(row["snapshot"])
+                snapshot.update(status="failed", error="The worker running this job stopped")
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', snapshot = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+                    (json.dumps(snapshot), now, now, row["id"])
+                )
+        return len(rows)
+
+    # Batches
+
+    def save_batch(self, batch_id: str, items: List[Dict[str, Any]]) -> None:
+        self.connection.execute(
+            "INSERT INTO batches (id, items, created_at) VALUES (?, ?, ?)",
+            (batch_id, json.dumps(items), time.time())
+        )
+
+    def load_batch(self, batch_id: str) -> Optional[List[Dict[str, Any]]]:
+        row = self.connection.execute("SELECT items FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        return json.loads(row["items"]) if row is not None else None
+
+    def prune_jobs(self, finished_before: float) -> None:
+        """Forget jobs that finished before the cutoff, and batches whose jobs are all gone"""
+        with self.transaction() as conn:
+            conn.execute(
+                "DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs WHERE finished_at < ?)",
+                (finished_before,)
+            )
+            conn.execute("DELETE FROM jobs WHERE finished_at < ?", (finished_before,))
+            conn.execute(
+                "DELETE FROM batches WHERE created_at < ? AND NOT EXISTS "
+                "(SELECT 1 FROM json_each(batches.items) AS item "
+                "JOIN jobs ON jobs.id = json_extract(item.value, '$.job_id'))",
+                (finished_before,)
+            )
@@ -0,0 +1,154 @@
+import os
+import json
+import hashlib
+import threading
+import time
+import uuid
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """Normalize dialogue text so trivially different spellings share a cache entry"""
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split())
+
+class TTSCache:
+    """
+    Persistent, content-addressed store of synthesized audio with LRU eviction.
+
+    Entries live on disk as <key[:2]>/<key>.mp3 under the cache directory. The
+    disk is the source of truth, so worker processes can share a directory:
+    the LRU order is kept in memory, rebuilt from file modification times on
+    first use and every RESCAN_SECONDS, hits touch the file, and entries
+    written by other processes are picked up on lookup. get and put do disk
+    I/O and may be called from any thread.
+    """
+
+    RESCAN_SECONDS = 60.0  # How often the index is rebuilt to account for other processes' entries
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, least recently used first
+        self._total_bytes = 0
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(voice: str, text: str, params: Dict[str, str]) -> str:
+        """Hash voice, normalized text and TTS parameters into a cache key"""
+        payload = json.dumps([voice, normalize_text(text), sorted(params.items())], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.mp3"
+
+    def _load(self):
+        """Rebuild the in-memory LRU index from whatever is on disk; call with the lock held"""
+        self._loaded_at = time.monotonic()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        found = []
+        for path in self.directory.glob("*/*.mp3"):
+            try:
+                stat = path.stat()
+                found.append((stat.st_mtime, path.stem, stat.st_size))
+            except OSError:
+                continue
+        self._entries.clear()
+        self._total_bytes = 0
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+        logger.info(f"Loaded TTS cache with {len(self._entries)} entries ({self._total_bytes} bytes)")
+        self._evict()
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.RESCAN_SECONDS:
+            self._load()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            self._ensure_loaded()
+        path = self._path(key)
+        try:
+            # Read even if the index does not know the key; another process may have written it
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                # Missing, or removed underneath us; forget it
+                self._forget(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = len(data)
+                self._total_bytes += len(data)
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._ensure_loaded()
+        if not data or len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary name first so readers never see a partial file;
+            # the name is unique so workers writing the same key never share one
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+            try:
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+            except OSError:
+                tmp_path.unlink(missing_ok=True)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write TTS cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _forget(self, key: str):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its disk budget; call with the lock held"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, _ = next(iter(self._entries.items()))
+            self._forget(key)
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,72 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class WorkerPool:
+    """
+    Process pool for CPU-bound work such as PDF and HTML parsing.
+
+    At most max_workers + max_queue calls are handed to the executor at a
+    time; further callers wait on the event loop, so the executor's
+    internal queue never grows without bound.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.submitted = 0  # Calls currently handed to the executor
+        self.waiting = 0  # Calls waiting for room in the executor
+        self.completed = 0
+        self.failed = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = None
+
+    def _ensure_started(self):
+        if self._executor is None:
+            # spawn keeps workers free of the parent's threads and event loop
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+            logger.info(f"Started worker pool with {self.max_workers} processes")
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run func(*args) in a worker process and return its result"""
+        self._ensure_started()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.submitted += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.submitted -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": min(self.submitted, self.max_workers),
+            "queued": max(0, self.submitted - self.max_workers) + self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
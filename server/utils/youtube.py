@@ -0,0 +1,99 @@
+import re
+from typing import List, Optional
+from urllib.parse import urlparse, parse_qs
+
+# English locales in order of preference
+TRANSCRIPT_LANGUAGES = ["en", "en-US", "en-GB", "en-IN", "en-AU", "en-CA"]
+# The client matches on this phrase to explain that a video has no English captions
+NO_ENGLISH_TRANSCRIPT = "Could not find any English transcript for the video"
+
+VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+YOUTUBE_HOSTS = {"youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com"}
+# Path prefixes that are followed by the video ID, e.g. /shorts/<id>
+ID_PATH_PREFIXES = ("shorts", "embed", "live", "v", "e")
+
+def extract_youtube_id(url: str) -> str:
+    """
+    Return the 11-character video ID of a YouTube URL.
+
+    Accepts watch, shorts, embed, live and /v/ URLs on youtube.com and its
+    m./music./nocookie variants, youtu.be short links and bare video IDs.
+    """
+    url = url.strip()
+    if VIDEO_ID.match(url):
+        return url
+    if "://" not in url:
+        url = f"https://{url}"
+
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    segments = [segment for segment in parsed.path.split("/") if segment]
+
+    candidate = None
+    if host == "youtu.be":
+        candidate = segments[0] if segments else None
+    elif host in YOUTUBE_HOSTS:
+        if segments and segments[0] == "watch":
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        elif len(segments) >= 2 and segments[0] in ID_PATH_PREFIXES:
+            candidate = segments[1]
+        elif not segments:
+            # e.g. youtube.com/?v=<id>
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+
+    if candidate and VIDEO_ID.match(candidate):
+        return candidate
+    raise ValueError(f"Invalid YouTube URL: {url}")
+
+def _language_rank(language_code: str, languages: List[str]) -> Optional[int]:
+    """Position of language_code in the preference list; other variants of the first language rank last"""
+    if language_code in languages:
+        return languages.index(language_code)
+    if language_code.split("-")[0] == languages[0].split("-")[0]:
+        return len(languages)
+    return None
+
+def select_transcript(transcript_list, languages: List[str] = TRANSCRIPT_LANGUAGES):
+    """
+    Pick the best track from a TranscriptList without any further requests.
+
+    Manually created tracks beat auto-generated ones, then the locale order
+    in languages decides. Returns None if no track is in a preferred language.
+    """
+    ranked = []
+    for transcript in transcript_list:
+        rank = _language_rank(transcript.language_code, languages)
+        if rank is not None:
+            ranked.append((transcript.is_generated, rank, transcript))
+    if not ranked:
+        return None
+    return min(ranked, key=lambda item: item[:2])[2]
+
+def fetch_transcript(video_id: str, languages: List[str] = TRANSCRIPT_LANGUAGES) -> str:
+    """
+    Fetch the text of a video's best matching transcript.
+
+    The available tracks are listed once; if none is in a preferred
+    language, a translatable track is translated to the first one. Blocking,
+    so call it from a thread.
+    """
+    from youtube_transcript_api import TranscriptsDisabled, YouTubeTranscriptApi
+
+    try:
+        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+    except TranscriptsDisabled as e:
+        raise ValueError(f"{NO_ENGLISH_TRANSCRIPT} (captions are disabled)") from e
+    transcript = select_transcript(transcript_list, languages)
+    if transcript is None:
+        translatable = sorted(
+            (t for t in transcript_list if t.is_translatable),
+            key=lambda t: t.is_generated
+        )
+        if not translatable:
+            available = ", ".join(t.language_code for t in transcript_list) or "none"
+            raise ValueError(f"{NO_ENGLISH_TRANSCRIPT} (available: {available})")
+        transcript = translatable[0].translate(languages[0].split("-")[0])
+
+    return " ".join(item["text"] for item in transcript.fetch())